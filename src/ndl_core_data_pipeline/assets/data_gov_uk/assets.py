@@ -1,8 +1,10 @@
 import os
-import json
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
+
+import orjson
 
 from dagster import (
     asset,
@@ -30,11 +32,18 @@ public_license_filter = "license_id:(" + " OR ".join(PUBLIC_LICENCES) + ")"
 
 # Dynamic partitions for categories
 data_gov_categories = DynamicPartitionsDefinition(name="data_gov_categories")
+# Dynamic partitions for packages, keyed "<category>/<package id>"
+data_gov_packages = DynamicPartitionsDefinition(name="data_gov_packages")
 
 RAW_DATA_PATH = "data/raw/data_gov_uk_2"
 os.makedirs(RAW_DATA_PATH, exist_ok=True)
+# Package dicts from the category search, read back by the package runs instead of calling package_show again.
+# Kept outside RAW_DATA_PATH so they are not taken for downloaded data files
+PACKAGE_CACHE_PATH = "data/raw/data_gov_uk_2_packages"
 
 MAX_FILE_SIZE_BYTES = 25 * 1024 * 1024  # 25MB limit for file downloads
+MAX_CONCURRENT_DOWNLOADS = 8  # resource downloads in flight per package partition
+_SAFE_NAME = str.maketrans({"/": "_", " ": "_"})  # path separators and spaces -> "_"
 
 NETWORK_RETRY_POLICY = RetryPolicy(
     max_retries=3,
@@ -47,6 +56,7 @@ CATEGORIES_ENDPOINT = (
     "https://ckan.publishing.service.gov.uk/api/3/action/package_search?facet.field=[%22theme-primary%22]&rows=0"
 )
 PACKAGE_SEARCH_BASE = "https://ckan.publishing.service.gov.uk/api/action/package_search"
+PACKAGE_SHOW_BASE = "https://ckan.publishing.service.gov.uk/api/action/package_show"
 
 
 @asset(group_name="data_gov_crawling")
@@ -56,7 +66,7 @@ def data_gov_discover_categories(context: AssetExecutionContext, api_data_gov: R
     Uses the CKAN facet query to retrieve theme-primary facets and create
     partitions for each category name.
     """
-    resp = api_data_gov.get(CATEGORIES_ENDPOINT)
+    resp = api_data_gov.get(CATEGORIES_ENDPOINT, cached=True)
 
     facets = resp.get("result", {}).get("facets", {}).get("theme-primary", {})
     if not facets:
@@ -81,24 +91,16 @@ def data_gov_discover_categories(context: AssetExecutionContext, api_data_gov: R
     retry_policy=NETWORK_RETRY_POLICY,
 )
 def data_gov_process_category(context: AssetExecutionContext, api_data_gov: RateLimitedApiClient):
-    """Process the given category partition: retrieve top-10 recent datasets and download their resources.
+    """Process the given category partition: retrieve the most recent datasets and register them as package partitions.
 
-    The asset will create a directory per category under `data/raw/data_gov_uk/<category>/` and
-    for each package will write a metadata JSON and download each resource file. The implementation is
-    defensive and will continue on individual failures.
+    Each package found is added to the `data_gov_packages` dynamic partitions as `<category>/<package id>`,
+    so that `data_gov_process_package` can download the resources of every package as its own run.
     """
     category = context.partition_key
     context.log.info(f"Processing category partition: {category}")
 
-    # Prepare target directory
-    safe_category = category.replace("/", "_").replace(" ", "_")
-    target_dir = os.path.join(RAW_DATA_PATH, safe_category)
-    os.makedirs(target_dir, exist_ok=True)
-
-    source = "data.gov.uk"
     results_count = RESULTS_COUNT_PER_CATEGORY
     if category == "environment":
-        source = "environment.data.gov.uk"
         results_count = RESULTS_COUNT_FOR_ENVIRONMENT
 
     params = {
@@ -109,137 +111,277 @@ def data_gov_process_category(context: AssetExecutionContext, api_data_gov: Rate
     }
 
 
-    resp = api_data_gov.get(PACKAGE_SEARCH_BASE, params=params)
+    resp = api_data_gov.get(PACKAGE_SEARCH_BASE, params=params, cached=True)
     results = resp.get("result", {}).get("results", []) if isinstance(resp, dict) else []
+    # Only the package list is used; don't keep the rest of the search response alive
+    del resp
 
     if not results:
         context.log.info(f"No packages found for category '{category}'")
         context.add_output_metadata({"packages_found": 0})
-        return 0
+        return []
 
-    processed = 0
-    saved_packages = []
+    package_keys = []
     for pkg in results:
-        pkg_id = pkg.get("id") or pkg.get("name") or pkg.get("title", "package")
-        org = pkg.get("organization") or {}
-        tags_list = []
-        if pkg.get("tags"):
-            tags_list = [t.get("name") for t in pkg.get("tags")]
-        tags = set(tags_list)
-        tags.add(category)
-
-        meta: Dict[str, Any] = {
-            "title": pkg.get("title") or pkg.get("name") or pkg_id,
-            "description": pkg.get("notes"),
-            "source": source,
-            "creator": org.get("title") or org.get("name", ""),
-            "collection_time": now_iso8601_utc(),
-            "open_type": "Open Government",
-            "license": pkg.get("license_id") or pkg.get("license_title") or pkg.get("licence-custom", ""),
-            "language": pkg.get("locale", "en"),
-            "category": category,
-            "tags": list(tags),
-            "dataset_url": f"https://data.gov.uk/dataset/{pkg.get('id')}",
+        # package_show accepts either the id or the name
+        pkg_id = pkg.get("id") or pkg.get("name")
+        if not pkg_id:
+            context.log.warning(f"Package '{pkg.get('title')}' in category '{category}' has no id or name, skipping")
+            continue
+        # The search results already hold the full package, resources included
+        save_package(category, pkg_id, pkg)
+        package_keys.append(package_partition_key(category, pkg_id))
+
+    context.log.info(f"Registering {len(package_keys)} packages of category '{category}' as dynamic partitions")
+    context.instance.add_dynamic_partitions(
+        partitions_def_name=data_gov_packages.name,
+        partition_keys=package_keys,
+    )
+
+    context.add_output_metadata({"packages_found": len(results), "packages_registered": len(package_keys)})
+    return package_keys
+
+
+# No deps on data_gov_process_category: its partitions are categories, not "<category>/<package id>" keys,
+# so Dagster could not map one onto the other. Package partitions only exist once their category run has
+# registered them, and the trigger_data_gov_packages sensor launches the package runs from there.
+@asset(
+    group_name="data_gov_crawling",
+    partitions_def=data_gov_packages,
+    retry_policy=NETWORK_RETRY_POLICY,
+)
+def data_gov_process_package(context: AssetExecutionContext, api_data_gov: RateLimitedApiClient):
+    """Process the given package partition: load the package saved by its category run and download its resources.
+
+    The asset will create a directory per package under `data/raw/data_gov_uk/<category>/<package>/` and
+    for each resource will download the file and write a metadata JSON next to it. The implementation is
+    defensive and will continue on individual failures.
+    """
+    category, pkg_ref = split_package_partition_key(context.partition_key)
+    context.log.info(f"Processing package {pkg_ref} of category {category}")
+
+    pkg = load_package(category, pkg_ref)
+    if pkg is None:
+        # Saved by an older category run, or the file is gone: fetch it from CKAN instead
+        resp = api_data_gov.get(PACKAGE_SHOW_BASE, params={"id": pkg_ref}, cached=True)
+        pkg = resp.get("result") if isinstance(resp, dict) else None
+    if not pkg:
+        context.log.warning(f"Package {pkg_ref} not found in data.gov.uk")
+        context.add_output_metadata({"resources_found": 0, "resources_processed": 0})
+        return []
+
+    source = "data.gov.uk"
+    if category == "environment":
+        source = "environment.data.gov.uk"
+
+    # Prepare target directory
+    safe_category = category.translate(_SAFE_NAME)
+    target_dir = os.path.join(RAW_DATA_PATH, safe_category)
+
+    pkg_id = pkg.get("id") or pkg.get("name") or pkg.get("title", "package")
+    org = pkg.get("organization") or {}
+    tags_list = []
+    if pkg.get("tags"):
+        tags_list = [t.get("name") for t in pkg.get("tags")]
+    tags = set(tags_list)
+    tags.add(category)
+
+    meta: Dict[str, Any] = {
+        "title": pkg.get("title") or pkg.get("name") or pkg_id,
+        "description": pkg.get("notes"),
+        "source": source,
+        "creator": org.get("title") or org.get("name", ""),
+        "collection_time": now_iso8601_utc(),
+        "open_type": "Open Government",
+        "license": pkg.get("license_id") or pkg.get("license_title") or pkg.get("licence-custom", ""),
+        "language": pkg.get("locale", "en"),
+        "category": category,
+        "tags": list(tags),
+        "dataset_url": f"https://data.gov.uk/dataset/{pkg.get('id')}",
+    }
+
+    # Prepare package directory
+    safe_pkg_name = str(pkg_id).translate(_SAFE_NAME)
+    pkg_dir = os.path.join(target_dir, safe_pkg_name)
+    os.makedirs(pkg_dir, exist_ok=True)
+    # One directory listing per package instead of an exists() check per resource
+    existing = set(os.listdir(pkg_dir))
+
+    resources = pkg.get("resources", []) or []
+    # Package-level timestamps are shared by all of its resources; parsed once, on first use
+    package_times = None
+
+    # Collect every resource that still needs downloading, then fetch them concurrently.
+    downloads = []
+    for i, res in enumerate(resources):
+        # resource id (used for filenames)
+        res_id = res.get("id") or f"resource_{i}"
+        res_meta_fname = f"{res_id}_metadata.json"
+        res_meta_path = os.path.join(pkg_dir, res_meta_fname)
+
+        # If metadata file already exists for this resource, skip processing
+        if res_meta_fname in existing:
+            context.log.info(f"Resource metadata already exists for {res_id} in {pkg_dir}, skipping")
+            continue
+
+        if package_times is None:
+            package_times = {
+                "public_time": parse_to_iso8601_utc(pkg.get("metadata_modified", "")),
+                "first_publish_time": parse_to_iso8601_utc(pkg.get("datafile-date")) or parse_to_iso8601_utc(pkg.get("created", "")),
+            }
+
+        res_url = res.get("url") or res.get("resource_url")
+        resource_metadata = {
+            **meta,
+            "link": res_url,
+            "format": res.get("format", ""),
+            **package_times,
         }
 
-        # Prepare package directory
-        safe_pkg_name = str(pkg_id).replace("/", "_").replace(" ", "_")
-        pkg_dir = os.path.join(target_dir, safe_pkg_name)
-        os.makedirs(pkg_dir, exist_ok=True)
-
-        resources = pkg.get("resources", []) or []
-
-        for i, res in enumerate(resources):
-            # resource id (used for filenames)
-            res_id = res.get("id") or f"resource_{i}"
-            res_meta_fname = f"{res_id}_metadata.json"
-            res_meta_path = os.path.join(pkg_dir, res_meta_fname)
-
-            # If metadata file already exists for this resource, skip processing
-            if os.path.exists(res_meta_path):
-                context.log.info(f"Resource metadata already exists for {res_id} in {pkg_dir}, skipping")
-                continue
-
-            res_url = res.get("url") or res.get("resource_url")
-            resource_metadata = meta.copy()
-            resource_metadata["link"] = res_url
-            resource_metadata["format"] = res.get("format", "")
-            resource_metadata["public_time"] = parse_to_iso8601_utc(pkg.get("metadata_modified", ""))
-            resource_metadata["first_publish_time"] = parse_to_iso8601_utc(pkg.get("datafile-date")) or parse_to_iso8601_utc(pkg.get("created", ""))
-
-            if res.get("name"):
-                resource_metadata["collection_title"] = resource_metadata["title"]
-                resource_metadata["description"] = resource_metadata["title"] + ". " + resource_metadata["description"]
-                resource_metadata["title"] = res.get("name")
-
-            if not res_url:
-                context.log.warning(f"Package {pkg_id} resource #{i} has no URL")
-                continue
-
-            # Skip large files based on CKAN size metadata
-            res_size = res.get("size")
-            if res_size:
-                try:
-                    if int(res_size) > MAX_FILE_SIZE_BYTES:
-                        context.log.info(f"Skipping resource {res_id} from package {pkg_id}: size {res_size} bytes exceeds 30MB limit")
-                        continue
-                except (ValueError, TypeError):
-                    pass  # size field not a valid number, proceed with download
-
-            context.log.info(f"Downloading resource {res_id} from package {pkg_id}: {res_url}")
-
-            # Download using the API client; let exceptions propagate to fail the asset
-            saved_path, actual_name, ext = api_data_gov.download_file(res_url, pkg_dir, preferred_name=res_id)
-            if not saved_path:
-                # Treat a failed download as an error
-                # raise Exception(f"Download returned no file for resource {res_url} (package {pkg_id})")
-                # Facing gdrive access permission issues etc. - log and skip
-                context.log.warning(f"Download returned no file for resource {res_url} (package {pkg_id}), skipping")
-                continue
-
-            # Check actual file size after download (CKAN metadata may be inaccurate or missing)
-            if check_and_remove_oversized_file(
-                file_path=saved_path,
-                metadata_path=None,  # Metadata not written yet
-                max_size_bytes=MAX_FILE_SIZE_BYTES,
-                context=context,
-                resource_id=res_id,
-                package_id=pkg_id,
-            ):
-                continue  # File was oversized and removed, skip to next resource
-
-            # Update metadata with saved file info
-            try:
-                abs_raw_base = os.path.abspath(RAW_DATA_PATH)
-                rel_path = os.path.relpath(os.path.abspath(saved_path), start=abs_raw_base)
-            except Exception:
-                rel_path = os.path.basename(saved_path)
+        if res.get("name"):
+            resource_metadata["collection_title"] = resource_metadata["title"]
+            resource_metadata["description"] = resource_metadata["title"] + ". " + resource_metadata["description"]
+            resource_metadata["title"] = res.get("name")
 
-            resource_metadata["data_file_path"] = rel_path
-            resource_metadata["format"] = (ext or resource_metadata.get("format") or "").lower()
-            resource_metadata["actual_data_file_name"] = actual_name or os.path.basename(saved_path)
+        if not res_url:
+            context.log.warning(f"Package {pkg_id} resource #{i} has no URL")
+            continue
 
-            # Write per-resource metadata file named '<res_id>_metadata.json'
+        # Skip large files based on CKAN size metadata
+        res_size = res.get("size")
+        if res_size:
             try:
-                with tempfile.NamedTemporaryFile("w", delete=False, dir=pkg_dir, suffix=".tmp") as tmp:
-                    json.dump(resource_metadata, tmp, indent=2)
-                    tmp_meta = tmp.name
-                os.replace(tmp_meta, res_meta_path)
-            except Exception as exc:
-                context.log.warning(f"Failed to write resource metadata for {res_id} in package {pkg_id}: {exc}")
-                # Attempt to remove the downloaded data file since metadata couldn't be written
-                try:
-                    if saved_path and os.path.exists(saved_path):
-                        os.remove(saved_path)
-                        context.log.info(f"Removed downloaded file {saved_path} because metadata write failed for resource {res_id} (package {pkg_id})")
-                except Exception as exc_rm:
-                    context.log.warning(f"Failed to remove downloaded file {saved_path} after metadata write failure for {res_id} (package {pkg_id}): {exc_rm}")
-
-            processed += 1
-            saved_packages.append(pkg_id)
-
-    context.add_output_metadata({"packages_found": len(results), "packages_processed": processed})
-    return saved_packages
+                if int(res_size) > MAX_FILE_SIZE_BYTES:
+                    context.log.info(f"Skipping resource {res_id} from package {pkg_id}: size {res_size} bytes exceeds 30MB limit")
+                    continue
+            except (ValueError, TypeError):
+                pass  # size field not a valid number, proceed with download
+
+        downloads.append((pkg_id, pkg_dir, res_id, res_url, res_meta_path, resource_metadata))
+
+    def _run(job):
+        return download_resource(context, api_data_gov, *job)
+
+    processed = 0
+    saved_resources = []
+    # Downloads are I/O bound, so overlap them on a small thread pool. Results come back in
+    # submission order and any exception raised by a download still fails the asset.
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS) as executor:
+        for job, saved in zip(downloads, executor.map(_run, downloads)):
+            if saved:
+                processed += 1
+                saved_resources.append(job[2])
+
+    context.add_output_metadata({"resources_found": len(resources), "resources_processed": processed})
+    return saved_resources
+
+
+def package_partition_key(category: str, pkg_id: str) -> str:
+    """Build the `data_gov_packages` partition key for a package of the given category."""
+    return f"{category}/{pkg_id}"
+
+
+def split_package_partition_key(partition_key: str) -> Tuple[str, str]:
+    """Split a `data_gov_packages` partition key into its category and package id."""
+    # CKAN package ids and names never contain '/', so split on the last one
+    category, pkg_id = partition_key.rsplit("/", 1)
+    return category, pkg_id
+
+
+def package_file_path(category: str, pkg_id: str) -> str:
+    """Path of the package dict saved by the category run for the given package."""
+    return os.path.join(PACKAGE_CACHE_PATH, category.translate(_SAFE_NAME), str(pkg_id).translate(_SAFE_NAME) + ".json")
+
+
+def save_package(category: str, pkg_id: str, pkg: Dict[str, Any]):
+    """Write a package dict from the category search for its package run to read."""
+    path = package_file_path(category, pkg_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", delete=False, dir=os.path.dirname(path), suffix=".tmp") as tmp:
+        tmp.write(orjson.dumps(pkg))
+        tmp_path = tmp.name
+    os.replace(tmp_path, path)
+
+
+def load_package(category: str, pkg_id: str) -> Dict[str, Any] | None:
+    """Read the package dict saved by the category run, or None if there is no readable one."""
+    try:
+        with open(package_file_path(category, pkg_id), "rb") as f:
+            pkg = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    return pkg if isinstance(pkg, dict) else None
+
+
+def download_resource(
+    context: AssetExecutionContext,
+    api_data_gov: RateLimitedApiClient,
+    pkg_id: str,
+    pkg_dir: str,
+    res_id: str,
+    res_url: str,
+    res_meta_path: str,
+    resource_metadata: Dict[str, Any],
+) -> bool:
+    """
+    Download a single CKAN resource into its package directory and write its metadata file.
+
+    Safe to run from worker threads: each call only touches its own data and metadata files.
+
+    Returns:
+        True if the resource was downloaded and processed, False if it was skipped.
+    """
+    context.log.info(f"Downloading resource {res_id} from package {pkg_id}: {res_url}")
+
+    # Download using the API client; let exceptions propagate to fail the asset
+    saved_path, actual_name, ext = api_data_gov.download_file(res_url, pkg_dir, preferred_name=res_id)
+    if not saved_path:
+        # Treat a failed download as an error
+        # raise Exception(f"Download returned no file for resource {res_url} (package {pkg_id})")
+        # Facing gdrive access permission issues etc. - log and skip
+        context.log.warning(f"Download returned no file for resource {res_url} (package {pkg_id}), skipping")
+        return False
+
+    # Check actual file size after download (CKAN metadata may be inaccurate or missing)
+    if check_and_remove_oversized_file(
+        file_path=saved_path,
+        metadata_path=None,  # Metadata not written yet
+        max_size_bytes=MAX_FILE_SIZE_BYTES,
+        context=context,
+        resource_id=res_id,
+        package_id=pkg_id,
+    ):
+        return False  # File was oversized and removed, skip to next resource
+
+    # Update metadata with saved file info
+    try:
+        abs_raw_base = os.path.abspath(RAW_DATA_PATH)
+        rel_path = os.path.relpath(os.path.abspath(saved_path), start=abs_raw_base)
+    except Exception:
+        rel_path = os.path.basename(saved_path)
+
+    resource_metadata["data_file_path"] = rel_path
+    resource_metadata["format"] = (ext or resource_metadata.get("format") or "").lower()
+    resource_metadata["actual_data_file_name"] = actual_name or os.path.basename(saved_path)
+
+    # Write per-resource metadata file named '<res_id>_metadata.json'
+    try:
+        with tempfile.NamedTemporaryFile("wb", delete=False, dir=pkg_dir, suffix=".tmp") as tmp:
+            tmp.write(orjson.dumps(resource_metadata, option=orjson.OPT_INDENT_2))
+            tmp_meta = tmp.name
+        os.replace(tmp_meta, res_meta_path)
+    except Exception as exc:
+        context.log.warning(f"Failed to write resource metadata for {res_id} in package {pkg_id}: {exc}")
+        # Attempt to remove the downloaded data file since metadata couldn't be written
+        try:
+            if saved_path and os.path.exists(saved_path):
+                os.remove(saved_path)
+                context.log.info(f"Removed downloaded file {saved_path} because metadata write failed for resource {res_id} (package {pkg_id})")
+        except Exception as exc_rm:
+            context.log.warning(f"Failed to remove downloaded file {saved_path} after metadata write failure for {res_id} (package {pkg_id}): {exc_rm}")
+
+    return True
+
 
 def check_and_remove_oversized_file(
     file_path: str,
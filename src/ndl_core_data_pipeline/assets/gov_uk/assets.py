@@ -1,9 +1,12 @@
 import os
 import math
-import json
 import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import timezone
 from typing import List, Optional, Dict, Any
+
+import orjson
+
 from dagster import (
     asset,
     AssetExecutionContext,
@@ -20,6 +23,8 @@ gov_uk_batches = DynamicPartitionsDefinition(name="gov_uk_search_batches")
 CRAWL_FROM_DATE = "2025-01-01"
 
 BATCH_SIZE = 100  # Process 100 documents per partition
+CONTENT_FETCH_WORKERS = 8  # concurrent Content API requests per batch
+_SAFE_NAME = str.maketrans({"/": "_", " ": "_"})  # path separators and spaces -> "_"
 RAW_DATA_PATH = "data/raw/gov_uk"
 os.makedirs(RAW_DATA_PATH, exist_ok=True)
 
@@ -38,7 +43,7 @@ def gov_uk_search_index(context: AssetExecutionContext, api_gov_uk: RateLimitedA
     3. Instruct Dagster to create partitions.
     """
     # Just fetch one item to get the 'total' field
-    response = api_gov_uk.get(f"/api/search.json?q=&filter_public_timestamp=from:{CRAWL_FROM_DATE}", params={"count": 1})
+    response = api_gov_uk.get(f"/api/search.json?q=&filter_public_timestamp=from:{CRAWL_FROM_DATE}", params={"count": 1}, cached=True)
     total_docs = response.get("total", 0)
 
     # Calculate number of batches needed (e.g., 1500 / 100 = 15 batches)
@@ -82,17 +87,22 @@ def gov_uk_process_batch(context: AssetExecutionContext, api_gov_uk: RateLimited
         context.log.warning(f"[{partition_key}] No results found. Batch might be empty.")
         return None
 
-    # 3. Retrieve the Content
+    # 3. Work out which items still need their content fetched
     files_processed = 0
     files_skipped = 0
+    # One directory listing per batch instead of an exists() check per item
+    existing_files = set(os.listdir(RAW_DATA_PATH))
+    to_fetch = []
     for item in results:
         link = item.get("link")
 
-        safe_name = link.strip("/").replace("/", "_")
-        target_file_path = f"{RAW_DATA_PATH}/{safe_name}.json"
-        if os.path.exists(target_file_path):
+        safe_name = link.strip("/").translate(_SAFE_NAME)
+        target_file_name = f"{safe_name}.json"
+        target_file_path = f"{RAW_DATA_PATH}/{target_file_name}"
+        if target_file_name in existing_files:
             files_skipped += 1
             continue
+        existing_files.add(target_file_name)
 
         if item.get("primary_publishing_organisation", []):
             orgs = item.get("primary_publishing_organisation", [])
@@ -115,23 +125,31 @@ def gov_uk_process_batch(context: AssetExecutionContext, api_gov_uk: RateLimited
             "language": item.get("locale", "en"),
             "format": "text"
         }
-
-        # get content
-        content_url = f"/api/content{link}"
-        content_resp = api_gov_uk.get(content_url)
-        content = content_resp.get("details", {}).get("body", "")
-        if content:
-            full_record = {
-                "metadata": metadata,
-                "text": content,
-                "full_api_response": content_resp
-            }
-
-            save_raw_file(full_record, target_file_path)
-
-            files_processed += 1
-            if files_processed % 10 == 0:
-                context.log.debug(f"[{partition_key}] processed {files_processed} items...")
+        to_fetch.append((link, metadata, target_file_path))
+
+    # 4. Retrieve the Content concurrently; the client's rate limit is shared by all workers
+    failed_links = []
+    with ThreadPoolExecutor(max_workers=CONTENT_FETCH_WORKERS) as executor:
+        futures = {
+            executor.submit(fetch_and_save_content, api_gov_uk, link, metadata, target_file_path): link
+            for link, metadata, target_file_path in to_fetch
+        }
+        for future in as_completed(futures):
+            link = futures[future]
+            try:
+                saved = future.result()
+            except Exception as exc:
+                context.log.error(f"[{partition_key}] Failed to fetch content for {link}: {exc}")
+                failed_links.append(link)
+                continue
+            if saved:
+                files_processed += 1
+                if files_processed % 10 == 0:
+                    context.log.debug(f"[{partition_key}] processed {files_processed} items...")
+
+    if failed_links:
+        # Fail the partition so the retry policy re-runs it; files saved above are skipped on retry
+        raise Exception(f"[{partition_key}] Failed to fetch content for {len(failed_links)} item(s): {failed_links}")
 
     context.add_output_metadata({
         "batch_index": batch_index,
@@ -142,14 +160,36 @@ def gov_uk_process_batch(context: AssetExecutionContext, api_gov_uk: RateLimited
     return f"Batch {batch_index} Complete"
 
 
-def save_raw_file(full_record: dict,target_file_path: str):
+def fetch_and_save_content(api_gov_uk: RateLimitedApiClient, link: str, metadata: Dict[str, Any], target_file_path: str) -> bool:
     """
-    Write JSON safely to a temp file then atomically rename.
+    Fetch the Content API record for `link` and save it with its metadata.
+    Returns True if a record was saved, False if the content has no body.
     """
-    with tempfile.NamedTemporaryFile("w", delete=False, dir=RAW_DATA_PATH, suffix=".tmp") as tmp:
-        json.dump(full_record, tmp, indent=2)
+    raw_resp = api_gov_uk.get_bytes(f"/api/content{link}")
+    content_resp = orjson.loads(raw_resp)
+    content = content_resp.get("details", {}).get("body", "")
+    if not content:
+        return False
+
+    full_record = {
+        "metadata": metadata,
+        "text": content,
+        # Embed the API response as received instead of re-serialising the parsed copy
+        "full_api_response": orjson.Fragment(raw_resp)
+    }
+    save_raw_file(full_record, target_file_path)
+    return True
+
+
+def save_raw_file(full_record: dict, target_file_path: str):
+    """
+    Write JSON safely to a temp file then atomically replace the target.
+    Values may be `orjson.Fragment`s holding pre-serialised JSON, which are written as-is.
+    """
+    with tempfile.NamedTemporaryFile("wb", delete=False, dir=RAW_DATA_PATH, suffix=".tmp") as tmp:
+        tmp.write(orjson.dumps(full_record, option=orjson.OPT_INDENT_2))
         tmp_path = tmp.name
-    os.rename(tmp_path, target_file_path)
+    os.replace(tmp_path, target_file_path)
 
 
 def search_batch(api_gov_uk: RateLimitedApiClient, start_offset: int) -> Any:
@@ -160,7 +200,7 @@ def search_batch(api_gov_uk: RateLimitedApiClient, start_offset: int) -> Any:
         "start": start_offset,
         "fields": "link,title,description,public_timestamp,organisations"
     }
-    resp = api_gov_uk.get("/api/search.json", params=search_params)
+    resp = api_gov_uk.get("/api/search.json", params=search_params, cached=True)
     results = resp.get("results", [])
     return results
 
@@ -169,19 +209,19 @@ def get_oldest_change_history(change_history: List[Dict], default_value: str) ->
     Return the oldest `public_timestamp` from change_history as an ISO8601 string,
     or None if no valid timestamps found.
     """
-    datetimes = [parse_iso_to_ts(default_value)]
-    for item in change_history:
-        ts = item.get("public_timestamp")
-        if not ts:
-            continue
-        try:
-            dt = parse_iso_to_ts(ts)
-        except Exception:
-            continue
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        datetimes.append(dt)
-    if not datetimes:
+    def _timestamps():
+        yield parse_iso_to_ts(default_value)
+        for item in change_history:
+            ts = item.get("public_timestamp")
+            if not ts:
+                continue
+            try:
+                dt = parse_iso_to_ts(ts)
+            except Exception:
+                continue
+            yield dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+    oldest = min(_timestamps(), default=None)
+    if oldest is None:
         return None
-    oldest = min(datetimes)
     return parse_to_iso8601_utc(oldest.astimezone(timezone.utc).isoformat())
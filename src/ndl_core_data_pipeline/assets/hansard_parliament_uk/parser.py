@@ -4,11 +4,62 @@ Transforms HoC speeches from XML to json files.
 
 Traverses the scrapedxml directory, parses each XML file, and extracts speeches along with metadata into scrapedjson directory in the same folder structure.
 """
+import os
+import queue
 import re
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
+from typing import Iterable, List, Optional, Set, Tuple, TypedDict
+
+import orjson
+from lxml import etree
+
 from ndl_core_data_pipeline.resources.time_utils import now_iso8601_utc, parse_to_iso8601_utc, parse_iso_to_ts
 
-def parser(source_dir=None, dest_dir=None, limit=None, single_file=None, dry_run=False):
+# Elements carrying Hansard records; '{*}' matches any namespace, including none
+RECORD_TAGS = ('{*}speech', '{*}ques', '{*}question', '{*}reply', '{*}ans', '{*}answer')
+# Parser options shared by every file: recover from malformed markup, allow very large documents and skip the
+# xml:id hash table, which Hansard never uses
+PARSE_OPTIONS = dict(recover=True, huge_tree=True, collect_ids=False)
+# Output folders already created by this process
+_created_dirs = set()
+# Serialized documents waiting for the writer thread; bounded so parsing cannot run far ahead of the disk
+WRITE_QUEUE_SIZE = 8
+# Paragraphs below a record element, compiled once and reused for every record
+_FIND_P = etree.XPath('.//p')
+
+
+class SpeechRecord(TypedDict):
+    """A <speech> element as read from the XML; text is None until the element is complete."""
+    id: Optional[str]
+    speakername: Optional[str]
+    person_id: Optional[str]
+    type: Optional[str]
+    oral_qnum: Optional[str]
+    text: Optional[str]
+
+
+class QaRecord(TypedDict):
+    """A question ('question') or answer ('reply') element of the wrans schema."""
+    kind: str
+    id: Optional[str]
+    speaker: str
+    text: Optional[str]
+
+
+class Conversation(TypedDict):
+    """A question with its answers, as written to the 'texts' list of the JSON output."""
+    start_id: Optional[str]
+    speakers: List[str]
+    text: str
+
+
+def parser(source_dir=None, dest_dir=None, limit=None, single_file=None, dry_run=False, max_workers=None, pretty=False,
+           force=False):
     """Parse XML files under source_dir and write JSON files under dest_dir.
 
     Inputs:
@@ -17,16 +68,15 @@ def parser(source_dir=None, dest_dir=None, limit=None, single_file=None, dry_run
     - limit: optional integer to limit number of files processed (for testing)
     - single_file: optional single file path to process (absolute or relative)
     - dry_run: if True, don't write output files, just parse and report
+    - max_workers: number of worker processes parsing files in parallel (defaults to os.cpu_count())
+    - pretty: if True, indent the JSON output (useful for debugging; compact output is smaller and faster to write)
+    - force: if True, re-parse files whose JSON output is already newer than the XML (skipped by default)
 
     Outputs:
     - returns number of files processed
 
-    Error modes: parse errors are logged and file skipped
+    Error modes: parse errors are logged and file skipped; empty XML files are skipped without parsing
     """
-    import os
-    import json
-    from lxml import etree
-
     current_dir = os.path.dirname(os.path.abspath(__file__))
     default_source = os.path.join(current_dir, '../../../../data/raw/hansard_gov_uk/scrapedxml/')
     default_dest = os.path.join(current_dir, '../../../../data/raw/hansard_gov_uk/scrapedjson/')
@@ -38,13 +88,25 @@ def parser(source_dir=None, dest_dir=None, limit=None, single_file=None, dry_run
     source_dir = os.path.abspath(source_dir)
     dest_dir = os.path.abspath(dest_dir)
 
-    # collect filenames
+    # collect filenames, with the modification time of each file
     filenamelist = []
+    mtimes = {}
     def absoluteFilePaths(rootdir):
-        for dirpath, _, filenames in os.walk(rootdir):
-            for f in filenames:
-                if f.lower().endswith('.xml'):
-                    filenamelist.append(os.path.join(dirpath, f))
+        # scandir entries carry the file type from the directory listing, so no extra stat per entry;
+        # the stat of XML files is cached on the entry and gives size and mtime in one call
+        stack = [rootdir]
+        while stack:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith('.xml'):
+                        st = entry.stat(follow_symlinks=False)
+                        # empty placeholder files have nothing to parse
+                        if st.st_size == 0:
+                            continue
+                        filenamelist.append(entry.path)
+                        mtimes[entry.path] = st.st_mtime
         return filenamelist
 
     if single_file:
@@ -55,104 +117,167 @@ def parser(source_dir=None, dest_dir=None, limit=None, single_file=None, dry_run
         if not os.path.exists(single_file_path):
             raise FileNotFoundError(single_file_path)
         filenamelist = [single_file_path]
+        mtimes[single_file_path] = os.stat(single_file_path).st_mtime
     else:
         filenamelist = sorted(absoluteFilePaths(source_dir))
 
+    if limit is not None:
+        filenamelist = filenamelist[:int(limit)]
+
+    # Files whose JSON is newer than the XML were parsed by an earlier run and count as processed
+    up_to_date = 0
+    if not force:
+        stale = [f for f in filenamelist if not _is_up_to_date(f, mtimes[f], source_dir, dest_dir)]
+        up_to_date = len(filenamelist) - len(stale)
+        filenamelist = stale
+
     total = len(filenamelist)
 
+    # The bar is only drawn on a terminal, and at most ~200 times per run
+    show_progress = sys.stdout.isatty()
+    progress_stride = max(1, total // 200)
+
     def printProgressBar(iteration, total, prefix='', suffix='', decimals=1, length=50, fill='█'):
-        if total == 0:
+        if total == 0 or not show_progress:
+            return
+        if iteration % progress_stride and iteration != total:
             return
         percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
         filledLength = int(length * iteration // total)
         bar = fill * filledLength + '-' * (length - filledLength)
-        print('\r%s |%s| %s%% %s' % (prefix, bar, percent, suffix), end='\r')
+        sys.stdout.write('\r%s |%s| %s%% %s\r' % (prefix, bar, percent, suffix))
         if iteration == total:
-            print()
+            sys.stdout.write('\n')
+        sys.stdout.flush()
 
     print('Parsing from:', source_dir)
     print('Writing to  :', dest_dir)
+    if up_to_date:
+        print(f"Skipping {up_to_date} up-to-date file(s)")
     printProgressBar(0, total, prefix='Parsing...', suffix='Complete', length=50)
 
-    processed = 0
-    for idx, filename in enumerate(filenamelist):
-        if limit is not None and processed >= int(limit):
-            break
+    # Files are independent, so parse them in worker processes; results come back in file order.
+    # Workers return the serialized JSON and a writer thread puts it on disk, so writing overlaps parsing.
+    processed = up_to_date
+    process_one = partial(_process_one, source_dir=source_dir, dest_dir=dest_dir, dry_run=dry_run, pretty=pretty)
+    write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    write_errors = []
+    writer = threading.Thread(target=_write_outputs, args=(write_queue, write_errors), daemon=True)
+    writer.start()
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            for idx, (filename, ok, message, out_path, data) in enumerate(executor.map(process_one, filenamelist, chunksize=8)):
+                if message:
+                    print(f"\n{message}")
+                if ok:
+                    processed += 1
+                    if data is not None:
+                        write_queue.put((out_path, data))
+                printProgressBar(idx + 1, total, prefix='Parsing...', suffix='Complete', length=50)
+    finally:
+        write_queue.put(None)
+        writer.join()
+
+    for message in write_errors:
+        print(message)
+    processed -= len(write_errors)
+
+    print(f"Processed {processed} file(s)")
+    return processed
+
+
+def _output_path(filename, source_dir, dest_dir):
+    """Return the JSON path mirroring filename (under source_dir) under dest_dir."""
+    return os.path.join(dest_dir, os.path.splitext(os.path.relpath(filename, source_dir))[0] + '.json')
+
+
+def _is_up_to_date(filename, src_mtime, source_dir, dest_dir):
+    """Tell whether the JSON output of filename exists and is at least as new as the XML."""
+    try:
+        return os.stat(_output_path(filename, source_dir, dest_dir)).st_mtime >= src_mtime
+    except OSError:
+        return False
+
 
+def _write_outputs(write_queue, errors):
+    """Write (out_path, data) items from write_queue until a None item arrives; failures are appended to errors."""
+    while True:
+        item = write_queue.get()
+        if item is None:
+            return
+        out_path, data = item
+        out_dir = os.path.dirname(out_path)
         try:
-            parser = etree.XMLParser(dtd_validation=False, recover=True)
-            tree = etree.parse(filename, parser)
-            root = tree.getroot()
+            # many files share an output folder; only create each one once
+            if out_dir not in _created_dirs:
+                os.makedirs(out_dir, exist_ok=True)
+                _created_dirs.add(out_dir)
+            with open(out_path, 'wb') as fh:
+                fh.write(data)
         except Exception as e:
-            print(f"\nERROR parsing {filename}: {e}")
-            printProgressBar(idx + 1, total, prefix='Parsing...', suffix='Complete', length=50)
-            continue
+            errors.append(f"ERROR writing {out_path}: {e}")
 
-        # debates vs wrans vs lordswrans
-        relative_path = os.path.relpath(filename, source_dir)
-        hansard_txt_type = inner_folder = os.path.basename(os.path.dirname(relative_path))
-        jsondoc = {
-            'meta': {
-                "link": "https://www.theyworkforyou.com/pwdata/scrapedxml/" + str(os.path.relpath(filename, source_dir)),
-                "title": str(os.path.splitext(relative_path)[0]),
-                "description": "UK Parliament Hansard data: " + str(os.path.splitext(relative_path)[0]),
-                "source": "hansard.parliament.uk",
-                "creator": "hansard.parliament.uk",
-                "public_time": extract_date(relative_path),
-                "collection_time": now_iso8601_utc(),
-                "open_type": "Open Government",
-                "license:": "Open Government Licence v3.0",
-                "language": "en",
-                "format": "text"
-            },
-            'texts': []
-        }
 
-        # Determine parser behavior by scanning element local names (namespace-agnostic)
-        has_speech = False
-        has_ques = False
-        for el in root.iter():
-            tag = _strip_tag(el.tag)
-            if tag == 'speech':
-                has_speech = True
-            if tag in ('ques', 'question'):
-                has_ques = True
-
-        if has_speech and has_ques:
-            print(f"\nWARNING: File {filename} contains both <speech> and <ques> elements; defaulting to <speech> processing.")
-
-        if has_speech:
-            jsondoc['texts'] = process_speech(root)
-        elif has_ques:
-            jsondoc['texts'] = process_qa(root)
-        else:
-            print(f"\nWARNING: No <speech> or <ques> elements found in {filename}, skipping file.")
-            printProgressBar(idx + 1, total, prefix='Parsing...', suffix='Complete', length=50)
-            continue
+def _process_one(filename, source_dir, dest_dir, dry_run, pretty=False):
+    """Parse a single XML file and serialize its JSON counterpart for dest_dir.
 
-        # build output path mirroring source_dir
-        relpath = os.path.relpath(filename, source_dir)
-        out_rel = os.path.splitext(relpath)[0] + '.json'
-        out_path = os.path.join(dest_dir, out_rel)
-        out_dir = os.path.dirname(out_path)
-        if not dry_run:
-            os.makedirs(out_dir, exist_ok=True)
-            try:
-                with open(out_path, 'w', encoding='utf-8') as fh:
-                    json.dump(jsondoc, fh, ensure_ascii=False, indent=2)
-            except Exception as e:
-                print(f"\nERROR writing {out_path}: {e}")
-                printProgressBar(idx + 1, total, prefix='Parsing...', suffix='Complete', length=50)
-                continue
+    Runs in a worker process, so problems are returned rather than printed.
+    Returns (filename, ok, message, out_path, data) where ok tells whether the file was parsed, message is a
+    warning/error to report (or None) and data is the JSON to write to out_path (None on a dry run or failure).
+    """
+    # Stream the file: records are collected as their elements complete and consumed elements are freed,
+    # so memory stays bounded by one speech rather than the whole document
+    try:
+        events = etree.iterparse(filename, events=('start', 'end'), tag=RECORD_TAGS, **PARSE_OPTIONS)
+        speech_conversations, qa_conversations, has_speech, has_ques = _collect_records(events, release=True)
+    except Exception as e:
+        return filename, False, f"ERROR parsing {filename}: {e}", None, None
+
+    # Path pieces are computed once and shared by the metadata and the output path;
+    # the inner folder tells debates vs wrans vs lordswrans apart
+    relative_path = os.path.relpath(filename, source_dir)
+    relative_stem = os.path.splitext(relative_path)[0]
+    jsondoc = {
+        'meta': {
+            "link": "https://www.theyworkforyou.com/pwdata/scrapedxml/" + relative_path,
+            "title": relative_stem,
+            "description": "UK Parliament Hansard data: " + relative_stem,
+            "source": "hansard.parliament.uk",
+            "creator": "hansard.parliament.uk",
+            "public_time": extract_date(relative_path),
+            "collection_time": now_iso8601_utc(),
+            "open_type": "Open Government",
+            "license:": "Open Government Licence v3.0",
+            "language": "en",
+            "format": "text"
+        },
+        'texts': []
+    }
+
+    message = None
+    if has_speech and has_ques:
+        message = f"WARNING: File {filename} contains both <speech> and <ques> elements; defaulting to <speech> processing."
+
+    if has_speech:
+        jsondoc['texts'] = speech_conversations
+    elif has_ques:
+        jsondoc['texts'] = qa_conversations
+    else:
+        return filename, False, f"WARNING: No <speech> or <ques> elements found in {filename}, skipping file.", None, None
 
-        processed += 1
-        printProgressBar(idx + 1, total, prefix='Parsing...', suffix='Complete', length=50)
+    # build output path mirroring source_dir
+    out_path = os.path.join(dest_dir, relative_stem + '.json')
+    if dry_run:
+        return filename, True, message, out_path, None
+    try:
+        data = orjson.dumps(jsondoc, option=orjson.OPT_INDENT_2 if pretty else 0)
+    except Exception as e:
+        return filename, False, f"ERROR writing {out_path}: {e}", None, None
 
-    print(f"Processed {processed} file(s)")
-    return processed
+    return filename, True, message, out_path, data
 
 
-def _strip_tag(tag):
+def _strip_tag(tag: object) -> str:
     """Strip namespace from an element tag and return the localname in lower case."""
     if tag is None:
         return ''
@@ -161,188 +286,244 @@ def _strip_tag(tag):
     return str(tag).lower()
 
 
-def process_speech(root):
+def process_speech(root: etree._Element) -> List[Conversation]:
     """Process XML tree containing <speech> elements and return list of conversations.
 
-    This is the refactored logic that was previously inline in parser():
-    - collects all <speech> elements in document order
-    - builds a flat_speeches list containing id, speakername, person_id, type, oral_qnum, text
-    - groups flat_speeches into conversations starting at speeches whose normalized type begins with 'startquestion'
+    - collects all <speech> elements in document order (see _collect_records)
+    - reads id, speakername, person_id, type, oral_qnum and paragraph text of each speech
+    - groups the speeches into conversations starting at speeches whose normalized type begins with 'startquestion'
     - returns conversations list
     """
-    flat_speeches = []
-    for speech in root.findall('.//speech'):
-        sattrib = dict(speech.attrib)
-        speech_id = sattrib.get('id')
-        speakername = sattrib.get('speakername') or sattrib.get('speaker')
-        person_id = sattrib.get('person_id') or sattrib.get('personid') or sattrib.get('person')
-        kind = sattrib.get('type')
-        oral_qnum = sattrib.get('oral-qnum') or sattrib.get('oral_qnum')
-
-        # collect paragraph texts
-        para_texts = []
-        for p in speech.findall('.//p'):
-            try:
-                p_text = ''.join(p.itertext()).strip()
-            except Exception:
-                p_text = (p.text or '').strip()
-            if p_text:
-                para_texts.append(p_text)
-
-        full_text = '\n\n'.join(para_texts)
-
-        flat_speeches.append({
-            'id': speech_id,
-            'speakername': speakername,
-            'person_id': person_id,
-            'type': kind,
-            'oral_qnum': oral_qnum,
-            'text': full_text,
-        })
-
-    # Group flat_speeches into conversations starting with type like 'Start Question'
-    conversations = []
-    current = None
-    for sp in flat_speeches:
-        t_raw = sp.get('type') or ''
-        t_norm = (t_raw or '').lower().replace(' ', '')
-        name = sp.get('speakername') or 'UNKNOWN'
-        segment_text = sp.get('text', '')
+    conversations, _, _, _ = _collect_records(etree.iterwalk(root, events=('start', 'end'), tag=RECORD_TAGS), schema='speech')
+    return conversations
+
+
+def process_qa(root: etree._Element) -> List[Conversation]:
+    """Process XML trees that use a question/answer schema (wrans, lordswrans).
+
+    Strategy:
+    - Walk document in order and collect elements whose localname is 'ques', 'question', 'reply', 'ans', or 'answer'
+    - Treat <ques> as Start Question and <reply> (or common variants) as the answering tag
+    - Group them into conversations starting at each question and appending the following replies until the next question
+    """
+    _, conversations, _, _ = _collect_records(etree.iterwalk(root, events=('start', 'end'), tag=RECORD_TAGS), schema='qa')
+    return conversations
+
+
+def _collect_records(
+    events: Iterable[Tuple[str, etree._Element]], release: bool = False, schema: Optional[str] = None
+) -> Tuple[List[Conversation], List[Conversation], bool, bool]:
+    """Group speech and question/answer records from a stream of (event, element) pairs into conversations.
+
+    `events` come from etree.iterparse (streaming a file) or etree.iterwalk (an in-memory tree) with 'start' and
+    'end' events for RECORD_TAGS. Records are created on 'start', so they keep document order, and get their
+    paragraph text on 'end', once the element is complete. Completed records are folded into their conversations
+    straight away, so no list of all records is kept. With release=True consumed elements (and everything
+    before them) are removed from the tree, which keeps streaming memory bounded.
+
+    Only un-namespaced <speech> elements below the root become speech records, as with findall('.//speech');
+    has_speech / has_ques report any speech / question element regardless of namespace.
+
+    schema selects the records to build: 'speech', 'qa', or None to decide while streaming. Speeches take
+    precedence over questions, so in that case question/reply records are dropped (and no longer built) as soon
+    as the first speech is seen.
+
+    Returns (speech_conversations, qa_conversations, has_speech, has_ques)
+    """
+    speeches = _SpeechConversations()
+    qa = _QaConversations()
+    has_speech = False
+    has_ques = False
+    open_records = []
+    # records in document order, waiting for their text; only nested records make this longer than one
+    pending = deque()
+    # module-level helpers and bound methods used per element, looked up once
+    strip_tag = _strip_tag
+    # localname per raw tag; only a handful of distinct tags pass the RECORD_TAGS filter
+    localnames = {}
+    intern = _intern
+    paragraph_text = _paragraph_text
+    push_record = open_records.append
+    pop_record = open_records.pop
+    add_pending = pending.append
+    for event, el in events:
+        if event == 'start':
+            raw_tag = el.tag
+            tag = localnames.get(raw_tag)
+            if tag is None:
+                tag = localnames[raw_tag] = strip_tag(raw_tag)
+            # read attributes straight from lxml's attribute view rather than copying them into a dict
+            attrib = el.attrib
+            record: Optional[dict] = None
+            if tag == 'speech':
+                if not has_speech and schema is None:
+                    qa = _QaConversations()
+                has_speech = True
+                if schema != 'qa' and raw_tag == 'speech' and el.getparent() is not None:
+                    record = {
+                        'id': attrib.get('id'),
+                        'speakername': intern(attrib.get('speakername') or attrib.get('speaker')),
+                        'person_id': intern(attrib.get('person_id') or attrib.get('personid') or attrib.get('person')),
+                        'type': intern(attrib.get('type')),
+                        'oral_qnum': attrib.get('oral-qnum') or attrib.get('oral_qnum'),
+                        'text': None,
+                    }
+                    add_pending((speeches, record))
+            else:
+                is_question = tag in ('ques', 'question')
+                has_ques = has_ques or is_question
+                if schema == 'qa' or (schema is None and not has_speech):
+                    record = {
+                        'kind': 'question' if is_question else 'reply',
+                        'id': attrib.get('id'),
+                        'speaker': intern(attrib.get('speakername') or attrib.get('speaker') or attrib.get('who') or attrib.get('name') or 'UNKNOWN'),
+                        'text': None,
+                    }
+                    add_pending((qa, record))
+            push_record(record)
+            continue
+
+        record = pop_record()
+        if record is not None:
+            record['text'] = paragraph_text(el)
+            while pending and pending[0][1]['text'] is not None:
+                conversations, done = pending.popleft()
+                conversations.add(done)
+        if release and not open_records:
+            el.clear(keep_tail=True)
+            parent = el.getparent()
+            if parent is not None:
+                while el.getprevious() is not None:
+                    del parent[0]
+
+    return speeches.close(), qa.close(), has_speech, has_ques
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern a repeated attribute value (speaker names, ids, speech types); None and '' are returned as-is."""
+    return sys.intern(value) if value else value
+
+
+def _paragraph_text(el: etree._Element) -> str:
+    """Return the text of the <p> elements below el, paragraphs separated by blank lines."""
+    # tostring(method='text') serialises the whole text content of a paragraph in one C call
+    tostring = etree.tostring
+    para_texts = []
+    append = para_texts.append
+    for p in _FIND_P(el):
+        p_text = tostring(p, method='text', encoding='unicode', with_tail=False).strip()
+        if p_text:
+            append(p_text)
+    return '\n\n'.join(para_texts)
+
+
+class _SpeechConversations:
+    """Group speech records into conversations as they arrive, each starting with a speech of type like 'Start Question'.
+
+    Segments are buffered per conversation and joined once when it is closed; speakers keep their
+    encounter order in the record while a set answers membership checks.
+    """
+
+    def __init__(self) -> None:
+        self.conversations: List[Conversation] = []
+        self._current: Optional[Conversation] = None
+        self._chunks: List[str] = []
+        self._seen_speakers: Set[str] = set()
+
+    def add(self, sp: SpeechRecord) -> None:
+        t_norm = (sp['type'] or '').lower().replace(' ', '')
+        name = sp['speakername'] or 'UNKNOWN'
+        segment_text = sp['text']
 
         # treat any variant of 'start question' as starting a new conversation
         if t_norm.startswith('startquestion'):
             # close existing conversation if present
-            if current is not None:
-                conversations.append(current)
-            # start a new conversation record
-            current = {
-                'start_id': sp.get('id'),
-                'speakers': [],
+            self._close_current()
+            # start a new conversation record with its first segment (may be empty)
+            self._current = {
+                'start_id': sp['id'],
+                'speakers': [name],
                 'text': ''
             }
-            # add first segment
-            current.setdefault('speakers', [])
-            speakers = current.setdefault('speakers', [])
-            if name not in speakers:
-                speakers.append(name)
-            # include the first segment (may be empty)
-            current['text'] = f"{name}:{segment_text}" if segment_text else f"{name}:"
-            continue
+            self._seen_speakers = {name}
+            self._chunks = [f"{name}:{segment_text}" if segment_text else f"{name}:"]
+            return
 
         # skip any speeches until we hit the first Start Question
-        if current is None:
-            continue
+        if self._current is None:
+            return
 
-        # append speaker to speakers list preserving encounter order (safe mutation for static analysis)
-        assert current is not None
-        speakers = current.setdefault('speakers', [])
-        if name not in speakers:
-            speakers.append(name)
+        # append speaker to speakers list preserving encounter order
+        if name not in self._seen_speakers:
+            self._seen_speakers.add(name)
+            self._current['speakers'].append(name)
 
-        # append this speech segment, separated by ' \p ' (coerce current text to str to satisfy type checkers)
-        if segment_text:
-            current['text'] = str(current.get('text', '')) + ' \\p ' + f"{name}: {segment_text}"
-        else:
-            current['text'] = str(current.get('text', '')) + ' \\p ' + f"{name}: "
+        # append this speech segment; segments are separated by ' \p ' when the conversation is closed
+        self._chunks.append(f"{name}: {segment_text}" if segment_text else f"{name}: ")
 
-    # append any open conversation
-    if current is not None:
-        conversations.append(current)
+    def close(self) -> List[Conversation]:
+        """Close any open conversation and return all conversations."""
+        self._close_current()
+        return self.conversations
 
-    return conversations
+    def _close_current(self) -> None:
+        if self._current is not None:
+            self._current['text'] = ' \\p '.join(self._chunks)
+            self.conversations.append(self._current)
+            self._current = None
 
 
-def process_qa(root):
-    """Process XML trees that use a question/answer schema (wrans, lordswrans).
+class _QaConversations:
+    """Group question/reply records into conversations as they arrive.
 
-    Strategy:
-    - Walk document in order and collect elements whose localname is 'ques', 'question', 'ans', or 'answer'
-    - Normalize ques -> treated as Start Question, ans/answer -> treated as Answer
-    - Build flat_speeches preserving order, including speakername where available and concatenated paragraph text
-    - Group flat_speeches into conversations starting at Start Question entries and appending subsequent answers until next Start Question
+    Each question opens a conversation that collects the following replies until the next question;
+    questions without a reply are ignored, as are replies before the first question.
     """
-    # New approach: treat <ques> as Start Question and <reply> (or common variants) as the answering tag.
-    # Walk the document in order, when we see a ques element, collect any following reply elements until
-    # the next ques. If no reply is present for a ques, ignore that ques.
-    elements = list(root.iter())
-    conversations = []
-    i = 0
-    n = len(elements)
-    while i < n:
-        el = elements[i]
-        tag = _strip_tag(el.tag)
-        if tag in ('ques', 'question'):
-            # collect question speaker and text
-            q_attrib = dict(el.attrib)
-            q_speaker = q_attrib.get('speakername') or q_attrib.get('speaker') or q_attrib.get('who') or q_attrib.get('name') or 'UNKNOWN'
-            # gather question paragraph text
-            q_paras = []
-            for p in el.findall('.//p'):
-                try:
-                    t = ''.join(p.itertext()).strip()
-                except Exception:
-                    t = (p.text or '').strip()
-                if t:
-                    q_paras.append(t)
-            q_text = '\n\n'.join(q_paras)
-
-            # scan forward to collect replies until next ques
-            replies = []
-            j = i + 1
-            while j < n:
-                jel = elements[j]
-                jtag = _strip_tag(jel.tag)
-                if jtag in ('ques', 'question'):
-                    break
-                if jtag in ('reply', 'ans', 'answer'):
-                    r_attrib = dict(jel.attrib)
-                    r_speaker = r_attrib.get('speakername') or r_attrib.get('speaker') or r_attrib.get('who') or r_attrib.get('name') or 'UNKNOWN'
-                    r_paras = []
-                    for p in jel.findall('.//p'):
-                        try:
-                            rt = ''.join(p.itertext()).strip()
-                        except Exception:
-                            rt = (p.text or '').strip()
-                        if rt:
-                            r_paras.append(rt)
-                    r_text = '\n\n'.join(r_paras)
-                    replies.append((r_speaker, r_text))
-                j += 1
-
-            # If there are no replies for this ques, ignore it (per spec)
-            if not replies:
-                i = j
-                continue
-
-            # Build conversation record: include question then replies
-            conv = {
-                'start_id': q_attrib.get('id'),
-                'speakers': [],
-                'text': ''
-            }
-            # add question speaker
-            conv.setdefault('speakers', [])
-            if q_speaker not in conv['speakers']:
-                conv['speakers'].append(q_speaker)
-            conv['text'] = f"{q_speaker}:{q_text}" if q_text else f"{q_speaker}:"
-
-            # append replies
-            for r_speaker, r_text in replies:
-                if r_speaker not in conv['speakers']:
-                    conv['speakers'].append(r_speaker)
-                if r_text:
-                    conv['text'] = conv['text'] + ' \\p ' + f"{r_speaker}: {r_text}"
-                else:
-                    conv['text'] = conv['text'] + ' \\p ' + f"{r_speaker}: "
-
-            conversations.append(conv)
-            # continue from j (next unprocessed element)
-            i = j
-            continue
 
-        i += 1
+    def __init__(self) -> None:
+        self.conversations: List[Conversation] = []
+        self._question: Optional[QaRecord] = None
+        self._replies: List[QaRecord] = []
+
+    def add(self, item: QaRecord) -> None:
+        if item['kind'] == 'question':
+            self._close_current()
+            self._question = item
+            self._replies = []
+        elif self._question is not None:
+            self._replies.append(item)
+
+    def close(self) -> List[Conversation]:
+        """Close any open conversation and return all conversations."""
+        self._close_current()
+        return self.conversations
+
+    def _close_current(self) -> None:
+        question, replies = self._question, self._replies
+        self._question = None
+        # If there are no replies for this ques, ignore it (per spec)
+        if question is None or not replies:
+            return
 
-    return conversations
+        # Build conversation record: include question then replies, separated by ' \p '
+        q_speaker = question['speaker']
+        q_text = question['text']
+        conv: Conversation = {
+            'start_id': question['id'],
+            'speakers': [q_speaker],
+            'text': ''
+        }
+        seen_speakers = {q_speaker}
+        chunks = [f"{q_speaker}:{q_text}" if q_text else f"{q_speaker}:"]
+        for reply in replies:
+            r_speaker = reply['speaker']
+            r_text = reply['text']
+            if r_speaker not in seen_speakers:
+                seen_speakers.add(r_speaker)
+                conv['speakers'].append(r_speaker)
+            chunks.append(f"{r_speaker}: {r_text}" if r_text else f"{r_speaker}: ")
+        conv['text'] = ' \\p '.join(chunks)
+        self.conversations.append(conv)
 
 def extract_date(filename):
     """
@@ -364,10 +545,14 @@ if __name__ == '__main__':
     LIMIT = None           # e.g. 10 to process only 10 files
     SINGLE_FILE = None     # e.g. '/abs/path/to/data/raw/hansard_gov_uk/scrapedxml/debates/....xml'
     DRY_RUN = False        # set True to parse but not write files
+    MAX_WORKERS = None     # worker processes; None uses all CPUs
+    PRETTY = False         # set True to indent the JSON output
+    FORCE = False          # set True to re-parse files whose JSON is already up to date
 
     # Example single file paths for manual testing (uncomment and adjust if needed):
     # SINGLE_FILE = '//Users/huseyinkir/workspaces/workspace1/ndl-core-data-pipeline/data/raw/hansard_gov_uk/scrapedxml/debates/debates2025-01-06b.xml'
     # SINGLE_FILE = '/Users/huseyinkir/workspaces/workspace1/ndl-core-data-pipeline/data/raw/hansard_gov_uk/scrapedxml/wrans/answers2025-01-02.xml'
 
     # Call parser using the local variables above (no CLI required)
-    parser(source_dir=SOURCE_DIR, dest_dir=DEST_DIR, limit=LIMIT, single_file=SINGLE_FILE, dry_run=DRY_RUN)
+    parser(source_dir=SOURCE_DIR, dest_dir=DEST_DIR, limit=LIMIT, single_file=SINGLE_FILE, dry_run=DRY_RUN, max_workers=MAX_WORKERS, pretty=PRETTY,
+           force=FORCE)
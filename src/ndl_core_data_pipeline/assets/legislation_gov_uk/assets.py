@@ -6,10 +6,10 @@ http://legislation.gov.uk/all/data.feed
 """
 
 import os
-import json
 import tempfile
-import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional, Tuple
+import orjson
 from dagster import asset, AssetExecutionContext, RetryPolicy, Backoff, Jitter
 from lxml import etree
 from ndl_core_data_pipeline.resources.api_client import RateLimitedApiClient
@@ -19,6 +19,8 @@ RAW_DATA_PATH = "data/raw/legislation_gov_uk/2025"
 os.makedirs(RAW_DATA_PATH, exist_ok=True)
 
 START_URL = "https://www.legislation.gov.uk/all/2025/data.feed"
+FEED_CHUNK_SIZE = 64 * 1024  # bytes of a feed page handed to the XML parser at a time
+ENTRY_FETCH_WORKERS = 8  # concurrent XHTML requests; the client's rate limit is shared by all workers
 
 NETWORK_RETRY_POLICY = RetryPolicy(
     max_retries=3,
@@ -28,6 +30,16 @@ NETWORK_RETRY_POLICY = RetryPolicy(
 )
 
 NS = {'ukm': 'http://www.legislation.gov.uk/namespaces/metadata'}
+ATOM = 'http://www.w3.org/2005/Atom'
+# Entry children read as text fields, by tag in Clark notation; Atom and un-namespaced tags are both accepted
+ENTRY_TEXT_TAGS = {
+    tag: name
+    for name in ('id', 'title', 'updated', 'published', 'summary')
+    for tag in (f"{{{ATOM}}}{name}", name)
+}
+LINK_TAGS = frozenset((f"{{{ATOM}}}link", 'link'))
+# ukm entry children carrying their value in a Value attribute, e.g. <ukm:ISBN Value="978..." />
+UKM_VALUE_TAGS = {f"{{{NS['ukm']}}}{name}": name for name in ('ISBN', 'Year', 'Number', 'CreationDate')}
 
 def _local_name(tag: Optional[str]) -> str:
     if not tag:
@@ -42,6 +54,12 @@ def _safe_name(file_name: str) -> str:
     return file_name.replace('/', '_').replace(' ', '').strip()
 
 
+def _saved_names() -> set:
+    """Return the names (without .json) of the records already saved in RAW_DATA_PATH, from one directory read."""
+    with os.scandir(RAW_DATA_PATH) as it:
+        return {entry.name[:-5] for entry in it if entry.name.endswith('.json')}
+
+
 @asset(group_name="legislation_gov_uk", retry_policy=NETWORK_RETRY_POLICY)
 def legislation_gov_uk_2025(context: AssetExecutionContext, api_legislation: RateLimitedApiClient):
     """
@@ -51,46 +69,50 @@ def legislation_gov_uk_2025(context: AssetExecutionContext, api_legislation: Rat
     Find entry.link with type="application/xhtml+xml", fetch its href content and store as "text".
 
     Write each record as a JSON file to data/raw/legislation_gov_uk/2025/<ISBN>.json
+
+    Feed pages are read in order while the XHTML of their entries is fetched and saved by a pool of
+    worker threads, so the crawl keeps paging instead of waiting for each entry in turn.
     """
     next_url = START_URL
     total_saved = 0
     total_skipped = 0
+    # records on disk, listed once; entries are added as they are handed to the workers
+    saved_names = _saved_names()
 
-    while next_url:
-        context.log.info(f"Fetching feed page: {next_url}")
-        page_text = fetch_text(api_legislation, next_url, context)
-        if not page_text:
-            context.log.error(f"Empty response for {next_url}, stopping")
-            break
-
-        try:
-            parser = etree.XMLParser(recover=True)
-            tree = etree.fromstring(page_text.encode('utf-8'), parser=parser)
-        except Exception as e:
-            context.log.error(f"Failed to parse feed XML from {next_url}: {e}")
-            break
-
-        # find all entry elements (namespace-agnostic)
-        entries = tree.findall('.//{*}entry')
-        context.log.info(f"Found {len(entries)} entries on page")
-
-        for entry in entries:
-            metadata = process_entry(entry, context, api_legislation)
+    with ThreadPoolExecutor(max_workers=ENTRY_FETCH_WORKERS) as executor:
+        futures = {}
+
+        def submit_entry(entry):
+            # entries are read here, on the crawling thread; only the XHTML fetch and the write go to the workers
+            nonlocal total_skipped
+            metadata = process_entry(entry, context, saved_names)
             if not metadata:
                 total_skipped += 1
-                continue
+                return
+            saved_names.add(_safe_name(metadata['file_name']) or metadata['file_name'])
+            future = executor.submit(fetch_and_save_entry, api_legislation, metadata, context)
+            futures[future] = metadata['file_name']
+
+        while next_url:
+            context.log.info(f"Fetching feed page: {next_url}")
+            page_url = next_url
+            try:
+                page = read_feed_page(api_legislation, page_url, submit_entry)
+            except etree.XMLSyntaxError as e:
+                context.log.error(f"Failed to parse feed XML from {page_url}: {e}")
+                break
+            if page is None:
+                context.log.error(f"Empty response for {page_url}, stopping")
+                break
+            entry_count, next_url = page
+            context.log.info(f"Found {entry_count} entries on page")
+
+        for future in as_completed(futures):
             try:
-                save_record(metadata['file_name'], metadata)
+                future.result()
                 total_saved += 1
             except Exception as e:
-                context.log.error(f"Failed to save record for file={metadata['file_name']}: {e}")
-
-        # Find next link rel="next"
-        next_url = None
-        for l in tree.findall('.//{*}link'):
-            if (l.get('rel') or '').lower() == 'next':
-                next_url = l.get('href')
-                break
+                context.log.error(f"Failed to save record for file={futures[future]}: {e}")
 
     context.add_output_metadata({
         'saved': total_saved,
@@ -99,61 +121,117 @@ def legislation_gov_uk_2025(context: AssetExecutionContext, api_legislation: Rat
 
     return f"Saved {total_saved} items"
 
-def process_entry(entry, context, api_legislation):
+def read_feed_page(api_legislation: RateLimitedApiClient, url: str, on_entry: Callable) -> Optional[Tuple[int, Optional[str]]]:
+    """
+    Stream a feed page through the XML parser, calling on_entry(entry) for each <entry> as soon as it is complete.
+
+    Entries are released from the tree once handled, so memory stays bounded by one entry rather than the page.
+    :param api_legislation: RateLimitedApiClient for legislation.gov.uk
+    :param url: feed page URL
+    :param on_entry: callback receiving each entry element
+    :return: (number of entries, href of the first rel="next" link or None), or None if the response was empty
     """
-    Process a single feed entry element to extract metadata and fetch text content.
+    parser = etree.XMLPullParser(events=('end',), tag=('{*}entry', '{*}link'), recover=True, huge_tree=True)
+    entry_count = 0
+    next_url = None
+
+    def handle_events():
+        nonlocal entry_count, next_url
+        for _, el in parser.read_events():
+            if el.tag in LINK_TAGS or _local_name(el.tag) == 'link':
+                # links inside entries are read with their entry; this only looks for paging links
+                if next_url is None and (el.get('rel') or '').lower() == 'next':
+                    next_url = el.get('href')
+                continue
+            entry_count += 1
+            on_entry(el)
+            el.clear()
+            parent = el.getparent()
+            if parent is not None:
+                while el.getprevious() is not None:
+                    del parent[0]
+
+    def feed(chunks) -> bool:
+        received = False
+        for chunk in chunks:
+            if not chunk:
+                continue
+            received = True
+            parser.feed(chunk)
+            handle_events()
+        return received
+
+    if api_legislation.cache_path:
+        # with the response cache on, the page is revalidated and an unchanged page is read back from the cache
+        received = feed((api_legislation.get_bytes(url, cached=True, timeout=20),))
+    else:
+        api_legislation.throttle()
+        session = api_legislation.shared_session()
+        with session.get(url, timeout=20, stream=True) as resp:
+            resp.raise_for_status()
+            received = feed(resp.iter_content(chunk_size=FEED_CHUNK_SIZE))
+    if not received:
+        return None
+    parser.close()
+    handle_events()
+    return entry_count, next_url
+
+def process_entry(entry, context, saved_names: Optional[set] = None):
+    """
+    Process a single feed entry element to extract metadata; the text is fetched by fetch_and_save_entry.
     :param entry: Feed entry XML element
     :param context: Dagster asset execution context
-    :param api_legislation: RateLimitedApiClient for legislation.gov.uk
-    :return: Metadata dictionary
+    :param saved_names: names of the records already saved (see _saved_names); listed from disk if None
+    :return: Metadata dictionary, or None if the record is already saved
     """
-    data = {}
+    # one pass over the direct children collects the text fields, the ukm values and the links,
+    # dispatching on the full tag so no namespace has to be split off
+    fields = {}
+    ukm_values = {}
+    xhtml_href = None
+    main_link = None
     for child in entry.iterchildren():
-        lname = _local_name(child.tag)
-        # For simple text elements record their text
-        if len(child) == 0:
-            data[lname] = (child.text or '').strip() if child.text is not None else ''
+        tag = child.tag
+        field = ENTRY_TEXT_TAGS.get(tag)
+        if field is not None:
+            # only simple text elements carry a value
+            fields[field] = (child.text or '').strip() if len(child) == 0 else None
+        elif tag in LINK_TAGS:
+            href = child.get('href')
+            ltype = child.get('type')
+            rel = child.get('rel')
+            if ltype and ltype.lower() == 'application/xhtml+xml':
+                xhtml_href = href
+            if rel and rel.lower() == 'self':
+                main_link = href
         else:
-            # for elements with children like link, etc. leave processing to more specific logic
-            data.setdefault(lname, [])
-            data[lname].append(child)
+            ukm_name = UKM_VALUE_TAGS.get(tag)
+            if ukm_name is not None:
+                ukm_values.setdefault(ukm_name, child.get('Value'))
 
     # Basic fields
-    entry_id = data.get('id') if isinstance(data.get('id'), str) else None
-    title = data.get('title') if isinstance(data.get('title'), str) else None
-    updated = data.get('updated') if isinstance(data.get('updated'), str) else None
-    published = data.get('published') if isinstance(data.get('published'), str) else None
-    summary = data.get('summary') if isinstance(data.get('summary'), str) else None
+    entry_id = fields.get('id')
+    title = fields.get('title')
+    updated = fields.get('updated')
+    published = fields.get('published')
+    summary = fields.get('summary')
     # Some ukm fields are empty elements with attributes, e.g. <ukm:ISBN Value="978..." />
-    isbn_element = entry.find('ukm:ISBN', namespaces=NS)
-    isbn = isbn_element.get('Value') if isbn_element is not None else ""
-    year_element = entry.find('ukm:Year', namespaces=NS)
-    year = year_element.get('Value') if year_element is not None else ""
-    number_element = entry.find('ukm:Number', namespaces=NS)
-    number = number_element.get('Value') if number_element is not None else ""
-    creation_date_element = entry.find('ukm:CreationDate', namespaces=NS)
-    creation_date = creation_date_element.get('Value') if creation_date_element is not None else ""
+    isbn = ukm_values.get('ISBN', "")
+    year = ukm_values.get('Year', "")
+    number = ukm_values.get('Number', "")
+    creation_date = ukm_values.get('CreationDate', "")
 
     file_name = entry_id.replace("http://www.legislation.gov.uk/id/", "")
 
     # If target file already exists, skip processing to avoid re-downloading/re-writing
     fname_safe = _safe_name(file_name) or file_name
-    target_path = os.path.join(RAW_DATA_PATH, f"{fname_safe}.json")
-    if os.path.exists(target_path):
+    if saved_names is None:
+        saved_names = _saved_names()
+    if fname_safe in saved_names:
+        target_path = os.path.join(RAW_DATA_PATH, f"{fname_safe}.json")
         context.log.info(f"Skipping entry because file already exists: {target_path}")
         return None
 
-    xhtml_href = None
-    main_link = None
-    for link_el in entry.findall('.//{*}link'):
-        href = link_el.get('href')
-        ltype = link_el.get('type')
-        rel = link_el.get('rel')
-        if ltype and ltype.lower() == 'application/xhtml+xml':
-            xhtml_href = href
-        if rel and rel.lower() == 'self':
-            main_link = href
-
     metadata = {
         'id': entry_id,
         'link': main_link,
@@ -174,12 +252,21 @@ def process_entry(entry, context, api_legislation):
         "data_link": xhtml_href
     }
 
-    context.log.info(f"Fetching XHTML for file={file_name}: {xhtml_href}")
-    text_content = fetch_text(api_legislation, xhtml_href, context, allow_fail=True)
-    metadata['text'] = text_content
-
     return metadata
 
+def fetch_and_save_entry(api_legislation: RateLimitedApiClient, metadata: dict, context: AssetExecutionContext):
+    """
+    Fetch the XHTML text of an entry into metadata['text'] and save the record. Runs on a worker thread.
+    :param api_legislation: RateLimitedApiClient for legislation.gov.uk
+    :param metadata: Metadata dictionary from process_entry
+    :param context: Dagster asset execution context
+    """
+    file_name = metadata['file_name']
+    xhtml_href = metadata['data_link']
+    context.log.info(f"Fetching XHTML for file={file_name}: {xhtml_href}")
+    metadata['text'] = fetch_text(api_legislation, xhtml_href, context, allow_fail=True)
+    save_record(file_name, metadata)
+
 def fetch_text(api_legislation: RateLimitedApiClient, url: str, context: AssetExecutionContext, allow_fail: bool = False) -> Optional[str]:
     """
     Fetch XHTML text content from the given URL and return as text to be processed later.
@@ -189,11 +276,13 @@ def fetch_text(api_legislation: RateLimitedApiClient, url: str, context: AssetEx
     :param allow_fail:
     :return:
     """
-    rate = getattr(api_legislation, "rate_limit_per_second", None)
-    if rate and rate > 0:
-        time.sleep(1.0 / rate)
     try:
-        session = api_legislation.get_session()
+        if api_legislation.cache_path:
+            # documents do not change once published, so reruns are mostly answered by a 304 from the response cache
+            return api_legislation.get_bytes(url, cached=True, timeout=20).decode('utf-8', errors='replace')
+        # request slots are shared by all threads, so concurrent fetches stay within the client's rate limit
+        api_legislation.throttle()
+        session = api_legislation.shared_session()
         resp = session.get(url, timeout=20)
         resp.raise_for_status()
         return resp.text
@@ -207,7 +296,7 @@ def save_record(file_name: str, record: dict):
     fname = _safe_name(file_name) or file_name
     target = os.path.join(RAW_DATA_PATH, f"{fname}.json")
     # atomic write
-    with tempfile.NamedTemporaryFile("w", delete=False, dir=RAW_DATA_PATH, suffix=".tmp", encoding="utf-8") as tmp:
-        json.dump(record, tmp, ensure_ascii=False, indent=2)
+    with tempfile.NamedTemporaryFile("wb", delete=False, dir=RAW_DATA_PATH, suffix=".tmp") as tmp:
+        tmp.write(orjson.dumps(record, option=orjson.OPT_INDENT_2))
         tmp_path = tmp.name
     os.replace(tmp_path, target)
\ No newline at end of file
@@ -7,18 +7,21 @@ designated raw data directory.
 """
 
 import os
-import json
+import re
 import tempfile
 import urllib.parse
-import glob
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional, List, Dict
 
+import orjson
+
 from dagster import asset, AssetExecutionContext, RetryPolicy, Backoff, Jitter
 
 from ndl_core_data_pipeline.resources.api_client import RateLimitedApiClient
 from ndl_core_data_pipeline.resources.time_utils import now_iso8601_utc, parse_to_iso8601_utc
 
 RESOURCES_PER_TOPIC = 1000
+FETCH_WORKERS = 16  # concurrent topic searches and CSV downloads; the client's rate limit is shared by all workers
 
 RAW_DATA_PATH = "data/raw/ons_gov_uk_2"
 os.makedirs(RAW_DATA_PATH, exist_ok=True)
@@ -35,22 +38,14 @@ NETWORK_RETRY_POLICY = RetryPolicy(
 )
 
 
-def _safe_name(uri: str) -> str:
-    decoded = urllib.parse.unquote(uri)
-    cleaned = decoded.replace("/", "_")
-    safe = "".join(c if (c.isalnum() or c in "_-") else "_" for c in cleaned)
-    while "__" in safe:
-        safe = safe.replace("__", "_")
-    safe = safe.strip("_")
-    return safe[:200] if len(safe) > 200 else safe
+# Runs of characters other than letters, digits and '-' (underscores included), each collapsed to a single '_'
+_UNSAFE_RUN = re.compile(r"(?:[^\w-]|_)+")
 
 
-def _atomic_write_text(path: str, text: str, encoding: str = "utf-8") -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with tempfile.NamedTemporaryFile("w", delete=False, dir=os.path.dirname(path), encoding=encoding) as tmp:
-        tmp.write(text)
-        tmp_path = tmp.name
-    os.replace(tmp_path, path)
+def _safe_name(uri: str) -> str:
+    decoded = urllib.parse.unquote(uri)
+    safe = _UNSAFE_RUN.sub("_", decoded).strip("_")
+    return safe[:200]
 
 
 def _atomic_write_bytes(path: str, data: bytes) -> None:
@@ -61,6 +56,22 @@ def _atomic_write_bytes(path: str, data: bytes) -> None:
     os.replace(tmp_path, path)
 
 
+def _atomic_write_json(path: str, obj) -> None:
+    _atomic_write_bytes(path, orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+
+
+def _downloaded_names() -> Dict[str, set]:
+    """Map the extensions 'json' and 'csv' to the names (without extension) of the files in RAW_DATA_PATH, from one directory read."""
+    names = {"json": set(), "csv": set()}
+    with os.scandir(RAW_DATA_PATH) as it:
+        for entry in it:
+            stem, _, ext = entry.name.rpartition(".")
+            found = names.get(ext.lower())
+            if stem and found is not None:
+                found.add(stem)
+    return names
+
+
 def fetch_topics(api: RateLimitedApiClient, context: AssetExecutionContext) -> List[Dict]:
     """Use RateLimitedApiClient.get to fetch topics JSON and return items list."""
     try:
@@ -103,78 +114,98 @@ def download_csv_for_uri(api: RateLimitedApiClient, uri: str, context: AssetExec
         raise exc
 
 
+def save_timeseries(api: RateLimitedApiClient, uri: str, safe_name: str, metadata: Dict, context: AssetExecutionContext) -> bool:
+    """Download the CSV of a timeseries and write its metadata JSON next to it. Runs on a worker thread; returns True if saved."""
+    context.log.info(f"Downloading CSV for uri={uri}")
+    saved_path = download_csv_for_uri(api, uri, context, safe_name + ".csv")
+    if not saved_path:
+        context.log.error(f"Failed to download CSV for {uri}")
+        return False
+
+    # Determine base name (without extension) to write metadata JSON next to CSV
+    base = os.path.splitext(saved_path)[0]
+    json_path = f"{base}.json"
+
+    try:
+        _atomic_write_json(json_path, metadata)
+        context.log.info(f"Saved timeseries {uri} -> {saved_path}")
+        return True
+    except Exception as exc:
+        context.log.error(f"Failed to save metadata for {uri}: {exc}")
+        return False
+
+
 @asset(group_name="ons_gov_uk", retry_policy=NETWORK_RETRY_POLICY)
 def ons_gov_uk_timeseries(context: AssetExecutionContext, api_ons: RateLimitedApiClient):
-    """Fetch topics, latest timeseries per topic, download CSV and save metadata."""
+    """Fetch topics, latest timeseries per topic, download CSV and save metadata.
+
+    Topic searches and downloads run on a pool of FETCH_WORKERS threads sharing the client's
+    session and rate limit; items are checked and counted on the calling thread.
+    """
     topics = fetch_topics(api_ons, context)
     context.log.info(f"Fetched {len(topics)} topics from ONS")
 
     total_saved = 0
     total_skipped = 0
     failures = 0
+    # files on disk, listed once; names handed to the workers during this run are tracked in `queued`
+    downloaded = _downloaded_names()
+    queued = set()
 
+    topic_ids = []
     for t in topics:
         topic_id = t.get("id")
         if not topic_id:
             context.log.warning(f"Skipping topic with no id: {t}")
             continue
-        context.log.info(f"Processing topic {topic_id}")
-        timeseries_items = fetch_resources_for_topic(api_ons, topic_id, context)
-        context.log.info(f"Found {len(timeseries_items)} timeseries for topic {topic_id}")
-
-        for item in timeseries_items:
-            uri = item.get("uri")
-            if not uri:
-                context.log.warning(f"Skipping timeseries with no uri: {item}")
-                failures += 1
-                continue
-
-            safe = _safe_name(uri)
-
-            # Check for existing files: need both a CSV and JSON to consider it fully downloaded
-            pattern = os.path.join(RAW_DATA_PATH, f"{safe}.*")
-            matches = glob.glob(pattern)
-            has_json = any(m.lower().endswith('.json') for m in matches)
-            has_csv = any(m.lower().endswith('.csv') for m in matches)
-            if has_json and has_csv:
-                context.log.info(f"Skipping already-downloaded timeseries: {uri}")
-                total_skipped += 1
-                continue
-
-            metadata = {
-                "uri": uri,
-                "link": "https://www.ons.gov.uk" + uri,
-                "title": item.get("title") or "",
-                "description": item.get("summary") or "",
-                "public_time": parse_to_iso8601_utc(item.get("release_date", "")),
-                "first_publish_time": parse_to_iso8601_utc(item.get("release_date", "")),
-                "topics": item.get("keywords") or item.get("keyword") or [],
-                "source": "ons.gov.uk",
-                "collection_time": now_iso8601_utc(),
-                "open_type": "Open Government",
-                "license:": "Open Government Licence v3.0",
-                "language": "en",
-                "format": "csv",
-                "file_name": safe + ".csv",
-            }
-
-            context.log.info(f"Downloading CSV for uri={uri}")
-            saved_path = download_csv_for_uri(api_ons, uri, context, safe + ".csv")
-            if not saved_path:
-                context.log.error(f"Failed to download CSV for {uri}")
-                failures += 1
-                continue
-
-            # Determine base name (without extension) to write metadata JSON next to CSV
-            base = os.path.splitext(saved_path)[0]
-            json_path = f"{base}.json"
-
-            try:
-                _atomic_write_text(json_path, json.dumps(metadata, ensure_ascii=False, indent=2))
+        topic_ids.append(topic_id)
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        # results come back in topic order while later topics are still being searched
+        topic_results = executor.map(lambda tid: fetch_resources_for_topic(api_ons, tid, context), topic_ids)
+        futures = {}
+        for topic_id, timeseries_items in zip(topic_ids, topic_results):
+            context.log.info(f"Found {len(timeseries_items)} timeseries for topic {topic_id}")
+
+            for item in timeseries_items:
+                uri = item.get("uri")
+                if not uri:
+                    context.log.warning(f"Skipping timeseries with no uri: {item}")
+                    failures += 1
+                    continue
+
+                safe = _safe_name(uri)
+
+                # Check for existing files: need both a CSV and JSON to consider it fully downloaded
+                if (safe in downloaded["json"] and safe in downloaded["csv"]) or safe in queued:
+                    context.log.info(f"Skipping already-downloaded timeseries: {uri}")
+                    total_skipped += 1
+                    continue
+
+                metadata = {
+                    "uri": uri,
+                    "link": "https://www.ons.gov.uk" + uri,
+                    "title": item.get("title") or "",
+                    "description": item.get("summary") or "",
+                    "public_time": parse_to_iso8601_utc(item.get("release_date", "")),
+                    "first_publish_time": parse_to_iso8601_utc(item.get("release_date", "")),
+                    "topics": item.get("keywords") or item.get("keyword") or [],
+                    "source": "ons.gov.uk",
+                    "collection_time": now_iso8601_utc(),
+                    "open_type": "Open Government",
+                    "license:": "Open Government Licence v3.0",
+                    "language": "en",
+                    "format": "csv",
+                    "file_name": safe + ".csv",
+                }
+
+                queued.add(safe)
+                futures[executor.submit(save_timeseries, api_ons, uri, safe, metadata, context)] = uri
+
+        for future in as_completed(futures):
+            if future.result():
                 total_saved += 1
-                context.log.info(f"Saved timeseries {uri} -> {saved_path}")
-            except Exception as exc:
-                context.log.error(f"Failed to save metadata for {uri}: {exc}")
+            else:
                 failures += 1
 
     context.add_output_metadata({
@@ -1,12 +1,16 @@
 from dagster import asset, AssetExecutionContext, StaticPartitionsDefinition
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from uuid import uuid4
+from uuid import uuid4, UUID
 import json
-from typing import List, Optional, Dict, Any, Literal
+import orjson
+from typing import List, Optional, Dict, Any, Literal, Tuple, Iterable
 from langdetect import detect, DetectorFactory
+from langdetect.detector_factory import init_factory
 
 from ndl_core_data_pipeline.resources.refine.dedupe import deduplicate_folder
-from ndl_core_data_pipeline.resources.token_counter import count_tokens
+from ndl_core_data_pipeline.resources.token_counter import count_tokens, count_tokens_batch, preload_encoding
 
 from ndl_core_data_pipeline.resources.convertors.html_extractor import (
     extract_text_from_file as extract_text_from_html_file,
@@ -32,12 +36,52 @@ from ndl_core_data_pipeline.resources.refine.anonymizer import anonymize_text, r
 import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
+import pyarrow.compute as pc
 import math
+import os
+import re
 from tqdm import tqdm
 
 MIN_TEXT_LENGTH = 200
+LANGUAGE_SAMPLE_CHARS = 2000  # leading characters of a text used to detect its language
+# An HTML tag or comment; texts containing one are run through the HTML extractor. Stray angle brackets
+# (comparisons, arrows) do not match
+HTML_MARKUP = re.compile(r"</?[A-Za-z][A-Za-z0-9:-]*(?:\s[^<>]*)?/?>|<!--")
 SUPPORTED_FORMATS = ["text", "html", "htm", "xhtml", "csv", "xlsx", "xls", "pdf", "json", "ods"]
 BATCH_SIZE = 1000  # number of metadata files per partition; adjust as needed
+FORMAT_WORKERS = os.cpu_count()  # worker processes building records from metadata files
+STATUS_READ_WORKERS = 16  # threads reading partition status files in log_total_statistics
+UUID_POOL_SIZE = 1024  # record identifiers generated from one os.urandom call
+# Record fields filled from the metadata directly; any other non-empty metadata goes to extra_metadata
+COMMON_METADATA = frozenset({"identifier", "title", "description", "source", "date", "collection_time", "open_type", "license",
+                             "tags", "language", "format", "text", "word_count", "token_count", "data_file"})
+PARQUET_BATCH_ROWS = 4096  # records buffered before they are written to the partition parquet as one record batch
+# Writer options of the dataset parquet files (partition, aggregated, tagged and final). zstd compresses the text
+# columns far better than the default snappy; dictionary encoding and statistics are on by default in pyarrow.
+PARQUET_WRITE_OPTIONS = {"compression": "zstd", "compression_level": 3, "data_page_size": 1 << 20}
+# Columns of the aggregated dataset the classifier input is built from, and how much of a text it sees
+TAG_INPUT_COLUMNS = ["identifier", "title", "description", "format", "data_file", "text"]
+TAG_TEXT_CHARS = 3000
+
+# Columns of the dataset records built by add_dataset_record
+RECORD_SCHEMA = pa.schema([
+    ("identifier", pa.string()),
+    ("title", pa.string()),
+    ("description", pa.string()),
+    ("source", pa.string()),
+    ("date", pa.string()),
+    ("collection_time", pa.string()),
+    ("open_type", pa.string()),
+    ("license", pa.string()),
+    ("tags", pa.list_(pa.string())),
+    ("language", pa.string()),
+    ("format", pa.string()),
+    ("text", pa.string()),
+    ("word_count", pa.int64()),
+    ("token_count", pa.int64()),
+    ("data_file", pa.string()),
+    ("extra_metadata", pa.string()),
+])
 
 CURRENT_DIR = Path(__file__).parent
 TARGET_DIR = (CURRENT_DIR / "../../../../target").resolve()
@@ -76,10 +120,6 @@ def _build_partitions_def(batch_size: int = BATCH_SIZE) -> StaticPartitionsDefin
 
 PARTITIONS_DEF = _build_partitions_def()
 
-stats = dict()
-stats_unsupported = dict()
-data_file_not_found = list()
-
 @asset(
     group_name="processing"
 )
@@ -108,16 +148,13 @@ def format_records(context: AssetExecutionContext):
     if not input_file.exists():
         context.log.warning(f"No deduplicated records file found at {input_file}")
         return
-    with input_file.open("r", encoding="utf-8") as f:
-        file_paths = [line.strip() for line in f.readlines() if line.strip()]
-    context.log.info(f"Found {len(file_paths)} deduplicated files to format.")
 
     # Determine partition slice
     partition_key = getattr(context, "partition_key", None) or getattr(context, "asset_partition_key", None)
     if partition_key is None:
         # If no partition_key (materializing without partitions), process everything in a single run.
         start_idx = 0
-        end_idx = len(file_paths)
+        stop_idx = None
         partition_key = "0"
     else:
         try:
@@ -126,114 +163,91 @@ def format_records(context: AssetExecutionContext):
             context.log.error(f"Invalid partition key: {partition_key}. Expected integer string.")
             return
         start_idx = idx * BATCH_SIZE
-        end_idx = min(start_idx + BATCH_SIZE, len(file_paths))
+        stop_idx = start_idx + BATCH_SIZE
 
-    selected_paths = file_paths[start_idx:end_idx]
+    # The file is streamed line by line: only this partition's slice is kept, the other paths are just counted
+    selected_paths: List[str] = []
+    total_paths = 0
+    with input_file.open("r", encoding="utf-8") as f:
+        for line in f:
+            path = line.strip()
+            if not path:
+                continue
+            if total_paths >= start_idx and (stop_idx is None or total_paths < stop_idx):
+                selected_paths.append(path)
+            total_paths += 1
+    context.log.info(f"Found {total_paths} deduplicated files to format.")
+    end_idx = total_paths if stop_idx is None else min(stop_idx, total_paths)
     context.log.info(f"Partition {partition_key}: processing items {start_idx}..{end_idx} (count={len(selected_paths)})")
 
     final_meta_files = filter_supported_files(selected_paths)
     context.log.info(f"Processing {len(final_meta_files)} metadata json files to build parquet (partition {partition_key}).")
 
+    # Records are buffered in `rows` and streamed to the parquet file in batches of PARQUET_BATCH_ROWS,
+    # so memory holds one batch rather than the whole partition. The file is written under a temporary
+    # name and moved into place once complete.
     rows: List[Dict[str, Any]] = []
+    rows_written = 0
+    out_parquet = PROCESSED_DIR / f"ndl_core_dataset_part_{partition_key}.parquet"
+    tmp_parquet = PROCESSED_DIR / f"ndl_core_dataset_part_{partition_key}.parquet.tmp"
+    writer: Optional[pq.ParquetWriter] = None
+
+    def flush_rows():
+        nonlocal writer, rows_written
+        if not rows:
+            return
+        if writer is None:
+            writer = pq.ParquetWriter(str(tmp_parquet), RECORD_SCHEMA, **PARQUET_WRITE_OPTIONS)
+        batch = pa.RecordBatch.from_pylist(rows, schema=RECORD_SCHEMA)
+        word_count_index = RECORD_SCHEMA.get_field_index("word_count")
+        batch = batch.set_column(word_count_index, RECORD_SCHEMA.field(word_count_index),
+                                 _word_counts(batch.column("text")))
+        writer.write_batch(batch)
+        rows_written += len(rows)
+        rows.clear()
 
     DetectorFactory.seed = 0
+    # counters are per run, so partitions materialized in the same process do not add up each other's stats
+    stats: Dict[str, int] = {}
+    stats_unsupported: Dict[str, int] = {}
+    data_file_not_found: List[str] = []
     stats_empty_text = 0
     index = 0
     failed_meta: List[str] = []
     per_meta_exceptions = 0
-    for meta_path in final_meta_files:
-        if "hansard_gov_uk/scrapedxml" in str(meta_path):
-            # skip XML folder, we will process json version
-            continue
-        try:
+    # Metadata files are independent and their text extraction (HTML/PDF parsing, token counts) is CPU bound,
+    # so they are processed in worker processes; results come back in file order and are tallied here
+    with ProcessPoolExecutor(max_workers=FORMAT_WORKERS, initializer=_init_format_worker) as executor:
+        for meta_path, (outcome, fmt, meta_rows, error) in zip(
+                final_meta_files, executor.map(_process_meta, final_meta_files, chunksize=8)):
+            if outcome == "skipped":
+                continue
             index = index + 1
             print(f"Processing {index} / {len(final_meta_files)} - {meta_path}")
-            json_data = _read_json(meta_path)
-            if "metadata" in json_data:
-                meta =  json_data["metadata"]
-            elif "meta" in json_data:
-                meta = json_data["meta"]
-            else:
-                meta = json_data
-            text = json_data.get("text", "")
-            data_file = _find_associated_data_file(meta_path)
-            data_format = "text"
-
-            fmt = meta.get("format", "").lower()
-            # If not provided, try to infer format from associated data file
-            if not fmt and data_file:
-                fmt = data_file.suffix.lower().lstrip('.')
-
-            if fmt not in SUPPORTED_FORMATS:
+            if outcome == "unsupported":
                 stats_unsupported[fmt] = stats_unsupported.get(fmt, 0) + 1
                 continue
-
-            stats[fmt] = stats.get(fmt, 0) + 1
-
-            data_file_rel = ""
-            if fmt in {"json", "csv", "xlsx", "xls", "ods"}:
-                if data_file:
-                    conv = _convert_structured_to_parquet(data_file)
-                    if conv:
-                        data_file_rel = str(conv.relative_to(STRUCTURED_DIR))
-                    else:
-                        data_file_not_found.append(str(meta_path))
-                        continue
-                    text = ""
-                    data_format = "parquet"
-                else:
-                    data_file_not_found.append(str(meta_path))
-                    continue
-
-            if fmt in {"html", "htm", "xhtml", "pdf"}:
-                if data_file:
-                    if fmt in {"html", "htm", "xhtml"}:
-                        text = extract_text_from_html_file(data_file)
-                    elif fmt =="pdf":
-                        text = extract_text_from_pdf(str(data_file))
-
-            text = text.strip()
-            if "<" in text and ">" in text:
-                text = extract_text_from_html(text)
-
-            if data_format == "text" and "texts" not in json_data:
-                if not text or len(text.strip()) < MIN_TEXT_LENGTH:
-                    # skip empty or problematic text data
-                    stats_empty_text = stats_empty_text + 1
-                    continue
-
-            common_metadata = ["identifier", "title", "description", "source", "date", "collection_time", "open_type", "license", "tags",
-                               "language", "format", "text", "word_count", "token_count", "data_file"]
-            extra_metadata = {}
-            for keys in meta:
-                if keys not in common_metadata and meta[keys]:
-                    extra_metadata[keys] = meta[keys]
-
-            if "texts" in json_data:
-                conversation_id = 1
-                for conversation in json_data["texts"]:
-                    if not conversation.get("text") or len(conversation.get("text").strip()) < MIN_TEXT_LENGTH:
-                        # skip empty or problematic text data
-                        continue
-                    extra_metadata["speakers"] = conversation.get("speakers", [])
-                    add_dataset_record(data_file_rel, data_format, extra_metadata, meta, rows, conversation["text"], " conversation_" + str(conversation_id))
-                    conversation_id = conversation_id + 1
-            else:
-                add_dataset_record(data_file_rel, data_format, extra_metadata, meta, rows, text)
-        except Exception as exc:
-            # Record failed metadata and continue processing other files. This ensures a single bad file won't crash the partition.
-            per_meta_exceptions += 1
-            failed_meta.append(str(meta_path))
-            context.log.error(f"Failed processing {meta_path}: {exc}")
-            continue
-
-    # Write per-partition parquet
-    if rows:
-        df = pd.DataFrame(rows)
-        out_parquet = PROCESSED_DIR / f"ndl_core_dataset_part_{partition_key}.parquet"
-        table = pa.table(df)
-        pq.write_table(table, str(out_parquet))
-        context.log.info(f"Wrote {len(rows)} records to {out_parquet} (partition {partition_key})")
+            if fmt is not None:
+                stats[fmt] = stats.get(fmt, 0) + 1
+            if outcome == "data_file_not_found":
+                data_file_not_found.append(str(meta_path))
+            elif outcome == "empty_text":
+                stats_empty_text = stats_empty_text + 1
+            elif outcome == "failed":
+                # Record failed metadata and continue processing other files. This ensures a single bad file won't crash the partition.
+                per_meta_exceptions += 1
+                failed_meta.append(str(meta_path))
+                context.log.error(f"Failed processing {meta_path}: {error}")
+            rows.extend(meta_rows)
+            if len(rows) >= PARQUET_BATCH_ROWS:
+                flush_rows()
+
+    # Finish the per-partition parquet
+    flush_rows()
+    if writer is not None:
+        writer.close()
+        tmp_parquet.replace(out_parquet)
+        context.log.info(f"Wrote {rows_written} records to {out_parquet} (partition {partition_key})")
     else:
         context.log.info(f"No rows produced for partition {partition_key}")
 
@@ -244,7 +258,7 @@ def format_records(context: AssetExecutionContext):
         "end_index": end_idx,
         "input_count": len(selected_paths),
         "meta_files_count": len(final_meta_files),
-        "rows_written": len(rows),
+        "rows_written": rows_written,
         "failed_meta_count": len(failed_meta),
         "failed_meta": failed_meta,
         "per_meta_exceptions": per_meta_exceptions,
@@ -273,45 +287,193 @@ def format_records(context: AssetExecutionContext):
             context.log.warning(f"Partition {partition_key} had {len(failed_meta)} failed metadata files; and status file could not be written.")
 
 
+def _word_counts(texts: pa.Array) -> pa.Array:
+    """
+    Word counts of `texts`, equal to len(text.split()) for each, computed in Arrow for the whole column.
+    Texts are trimmed first, as splitting keeps an empty word for leading or trailing whitespace.
+    """
+    trimmed = pc.utf8_trim_whitespace(texts)
+    counts = pc.list_value_length(pc.utf8_split_whitespace(trimmed))
+    return pc.if_else(pc.equal(trimmed, ""), 0, counts).cast(pa.int64())
+
+
+def _init_format_worker():
+    """
+    Prepare a worker process of format_records: make langdetect deterministic and load the langdetect profiles
+    and the token encoding once, so they stay loaded for every file the worker handles.
+    """
+    DetectorFactory.seed = 0
+    try:
+        init_factory()
+        preload_encoding()
+    except Exception as e:
+        # leave it to the first file to load them and report the failure for that file
+        print(f"Failed to preload language profiles or token encoding: {e}")
+
+
+def _process_meta(meta_path: Path) -> Tuple[str, Optional[str], List[Dict[str, Any]], Optional[str]]:
+    """
+    Build the dataset records of one metadata file. Runs in a worker process of format_records.
+
+    Returns (outcome, fmt, rows, error) where outcome is one of "skipped", "unsupported", "data_file_not_found",
+    "empty_text", "ok" or "failed"; fmt is the detected format once it is known to be supported (the unsupported
+    format for "unsupported"); rows are the records built and error is the exception message for "failed".
+    """
+    if "hansard_gov_uk/scrapedxml" in str(meta_path):
+        # skip XML folder, we will process json version
+        return "skipped", None, [], None
+    rows: List[Dict[str, Any]] = []
+    supported_fmt = None
+    try:
+        json_data = _read_json(meta_path)
+        if "metadata" in json_data:
+            meta =  json_data["metadata"]
+        elif "meta" in json_data:
+            meta = json_data["meta"]
+        else:
+            meta = json_data
+        text = json_data.get("text", "")
+        data_file = _find_associated_data_file(meta_path)
+        data_format = "text"
+
+        fmt = meta.get("format", "").lower()
+        # If not provided, try to infer format from associated data file
+        if not fmt and data_file:
+            fmt = data_file.suffix.lower().lstrip('.')
+
+        if fmt not in SUPPORTED_FORMATS:
+            return "unsupported", fmt, [], None
+
+        supported_fmt = fmt
+
+        data_file_rel = ""
+        if fmt in {"json", "csv", "xlsx", "xls", "ods"}:
+            if data_file:
+                conv = _convert_structured_to_parquet(data_file)
+                if conv:
+                    data_file_rel = str(conv.relative_to(STRUCTURED_DIR))
+                else:
+                    return "data_file_not_found", fmt, [], None
+                text = ""
+                data_format = "parquet"
+            else:
+                return "data_file_not_found", fmt, [], None
+
+        if fmt in {"html", "htm", "xhtml", "pdf"}:
+            if data_file:
+                if "texts" not in json_data and data_file.stat().st_size < MIN_TEXT_LENGTH:
+                    # fewer bytes than MIN_TEXT_LENGTH cannot hold enough text, so skip the parse
+                    return "empty_text", fmt, [], None
+                if fmt in {"html", "htm", "xhtml"}:
+                    text = extract_text_from_html_file(data_file)
+                elif fmt =="pdf":
+                    text = extract_text_from_pdf(str(data_file))
+
+        text = text.strip()
+        if HTML_MARKUP.search(text):
+            text = extract_text_from_html(text)
+
+        if data_format == "text" and "texts" not in json_data:
+            if not text or len(text.strip()) < MIN_TEXT_LENGTH:
+                # skip empty or problematic text data
+                return "empty_text", fmt, [], None
+
+        extra_metadata = {key: value for key, value in meta.items() if value and key not in COMMON_METADATA}
+
+        if "texts" in json_data:
+            conversation_id = 1
+            for conversation in json_data["texts"]:
+                if not conversation.get("text") or len(conversation.get("text").strip()) < MIN_TEXT_LENGTH:
+                    # skip empty or problematic text data
+                    continue
+                extra_metadata["speakers"] = conversation.get("speakers", [])
+                add_dataset_record(data_file_rel, data_format, extra_metadata, meta, rows, conversation["text"], " conversation_" + str(conversation_id))
+                conversation_id = conversation_id + 1
+        else:
+            add_dataset_record(data_file_rel, data_format, extra_metadata, meta, rows, text)
+        # all records of the file are tokenized in one batch
+        for row, count in zip(rows, count_tokens_batch([row["text"] for row in rows])):
+            row["token_count"] = count
+    except Exception as exc:
+        # records built before the failure are kept, as they were when this ran in the asset loop
+        return "failed", supported_fmt, _rows_with_token_counts(rows), str(exc)
+    return "ok", supported_fmt, rows, None
+
+
+def _rows_with_token_counts(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Count the tokens of rows one at a time, returning the rows before the first one that cannot be counted."""
+    for i, row in enumerate(rows):
+        if row["token_count"] is None:
+            try:
+                row["token_count"] = count_tokens(row["text"])
+            except Exception:
+                return rows[:i]
+    return rows
+
+
 def add_dataset_record(data_file_rel: str, data_format: Literal["text"] | str, extra_metadata: dict[Any, Any],
                        meta: dict[str, Any] | None | Any, rows: list[dict[str, Any]], text: str, alt_description:str=""):
+    get = meta.get
     row = {
-        "identifier": str(uuid4()),
-        "title": (meta.get("title", "") + alt_description).strip(),
-        "description": ((meta.get("description", "") or "") + alt_description).strip(),
-        "source": meta.get("source", ""),
-        "date": meta.get("date", meta.get("public_time", meta.get("first_publish_time", ""))),
-        "collection_time": meta.get("collection_time"),
-        "open_type": meta.get("open_type", "Open Government"),
+        "identifier": _new_identifier(),
+        "title": (get("title", "") + alt_description).strip(),
+        "description": ((get("description", "") or "") + alt_description).strip(),
+        "source": get("source", ""),
+        "date": get("date", get("public_time", get("first_publish_time", ""))),
+        "collection_time": get("collection_time"),
+        "open_type": get("open_type", "Open Government"),
         "license": get_standard_license(meta),
-        "tags": meta.get("tags", []),
+        "tags": get("tags", []),
         "language": detect_language(meta, text),
         "format": data_format,
         "text": text,
-        "word_count": len(text.split()),
-        "token_count": count_tokens(text),
+        "word_count": None,  # counted for a whole batch of records when it is written, see _word_counts
+        "token_count": None,  # counted for all records of the file at once, see _process_meta
         "data_file": data_file_rel,
-        "extra_metadata": json.dumps(extra_metadata)
+        # orjson's compact output is valid JSON like json.dumps, and is built in C for every row
+        "extra_metadata": orjson.dumps(extra_metadata).decode("utf-8")
     }
     rows.append(row)
 
 
+LICENSE_MAP = { "open government licence v3.0": "OGL-UK-3.0",
+                "ogl": "OGL-UK-3.0",
+               "uk-ogl": "OGL-UK-3.0",
+               "ogl-uk-3.0": "OGL-UK-3.0",
+               "cc-by": "CC BY",
+               "other-pd": "Other PD",
+               "other-open": "Other Open",
+               "odc-pddl": "ODC-PDDL",
+               "odc-odbl": "ODC-ODbL",
+               "odc-by": "ODC-BY",
+               "cc-nc": "CC-NC",
+               "other-nc": "other-NC",
+               "cc-zero": "CC0"
+               }
+
+
+_uuid_pool: List[str] = []
+_uuid_pool_pid: Optional[int] = None
+
+
+def _new_identifier() -> str:
+    """
+    Return a random UUID string like str(uuid4()), taking the random bytes for UUID_POOL_SIZE identifiers
+    from a single os.urandom call. The pool belongs to the process that filled it, so forked workers never
+    hand out the same identifiers.
+    """
+    global _uuid_pool_pid
+    pid = os.getpid()
+    if not _uuid_pool or _uuid_pool_pid != pid:
+        random_bytes = os.urandom(16 * UUID_POOL_SIZE)
+        _uuid_pool[:] = [str(UUID(bytes=random_bytes[i:i + 16], version=4)) for i in range(0, len(random_bytes), 16)]
+        _uuid_pool_pid = pid
+    return _uuid_pool.pop()
+
+
 def get_standard_license(meta: dict[str, Any] | None | Any) -> str | None | Any:
-    license_map = { "open government licence v3.0": "OGL-UK-3.0",
-                    "ogl": "OGL-UK-3.0",
-                   "uk-ogl": "OGL-UK-3.0",
-                   "ogl-uk-3.0": "OGL-UK-3.0",
-                   "cc-by": "CC BY",
-                   "other-pd": "Other PD",
-                   "other-open": "Other Open",
-                   "odc-pddl": "ODC-PDDL",
-                   "odc-odbl": "ODC-ODbL",
-                   "odc-by": "ODC-BY",
-                   "cc-nc": "CC-NC",
-                   "other-nc": "other-NC",
-                   "cc-zero": "CC0"
-                   }
-    data_license = license_map.get(meta.get("license", "ogl-uk-3.0").lower())
+    # a missing key means OGL; a null license stays unmapped like an empty one instead of failing the record
+    data_license = LICENSE_MAP.get((meta.get("license", "ogl-uk-3.0") or "").lower())
     return data_license
 
 
@@ -319,7 +481,8 @@ def detect_language(meta: dict[str, Any] | None | Any, text: str) -> Any:
     language = None
     if text and len(text.strip()) > MIN_TEXT_LENGTH:
         try:
-            language = detect(text)
+            # langdetect's cost grows with the input length; the opening of a text is enough to tell its language
+            language = detect(text[:LANGUAGE_SAMPLE_CHARS])
         except Exception as e:
             print(f"Failed to detect language: {e}")
     if not language:
@@ -327,25 +490,39 @@ def detect_language(meta: dict[str, Any] | None | Any, text: str) -> Any:
     return language
 
 
-def _is_metadata_file(p: Path) -> bool:
-    return p.suffix.lower() == ".json" and p.stem.endswith("_metadata")
-
-
 def _read_json(p: Path) -> Optional[Dict[str, Any]]:
-    with p.open("r", encoding="utf-8") as fh:
-        return json.load(fh)
+    data = p.read_bytes()
+    try:
+        # orjson parses the UTF-8 bytes directly, without decoding them to a str first
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # json also accepts NaN / Infinity, which json.dump writes for float values
+        return json.loads(data)
 
 def _find_associated_data_file(meta_path: Path) -> Optional[Path]:
     """Given a metadata file like X_metadata.json, look for X.(json|csv|xlsx|ods|pdf|html|htm|txt) in the same directory."""
     base = meta_path.stem.removesuffix("_metadata")
-    candidates = [f"{base}.{extension}" for extension in SUPPORTED_FORMATS]
-    for name in candidates:
-        p = meta_path.parent / name
-        if p.exists():
-            return p
+    names = _directory_names(str(meta_path.parent))
+    for extension in SUPPORTED_FORMATS:
+        name = f"{base}.{extension}"
+        if name in names:
+            return meta_path.parent / name
     return None
 
 
+@lru_cache(maxsize=1024)
+def _directory_names(directory: str) -> frozenset:
+    """
+    Names in `directory`, listed with one scandir and cached, so the data files of all metadata files in a
+    directory are found without a stat per candidate extension. Raw data does not change while records are built.
+    """
+    try:
+        with os.scandir(directory) as it:
+            return frozenset(entry.name for entry in it)
+    except OSError:
+        return frozenset()
+
+
 def _convert_structured_to_parquet(data_path: Path) -> Optional[Path]:
     """Convert structured input (json/csv/xlsx/ods) into a parquet file placed in DATA_DIR/structured with a UUID name.
     Returns the relative path (to DATA_DIR) Path object of written parquet or None on failure.
@@ -373,7 +550,7 @@ def _convert_structured_to_parquet(data_path: Path) -> Optional[Path]:
     print(f"Cannot convert {data_path} to parquet")
     return None
 
-def filter_supported_files(file_paths: list[str]) -> list[Path]:
+def filter_supported_files(file_paths: Iterable[str]) -> list[Path]:
     """
     Filters supported files also removes json data files (not metadata file).
     :param file_paths: all paths
@@ -381,15 +558,18 @@ def filter_supported_files(file_paths: list[str]) -> list[Path]:
     """
     # final_meta_files: List[Path] = [Path(p) for p in file_paths if Path(p).suffix.lower() != ".json" and Path(
     #     p).suffix.lower() in SUPPORTED_EXTENSIONS]
-    final_meta_files: List[Path] = list()
 
-    json_paths = [Path(p) for p in file_paths if Path(p).suffix.lower() == ".json"]
-    metadata_paths = [p for p in json_paths if _is_metadata_file(p)]
-    meta_basenames = {p.stem.removesuffix("_metadata") for p in metadata_paths}
-    for p in json_paths:
-        if p.stem not in meta_basenames:
-            final_meta_files.append(p)
-    return final_meta_files
+    # One pass over the raw strings; Path objects are only built for the files returned
+    json_files = []
+    meta_basenames = set()
+    for p in file_paths:
+        stem, ext = os.path.splitext(os.path.basename(p))
+        if ext.lower() != ".json":
+            continue
+        json_files.append((p, stem))
+        if stem.endswith("_metadata"):
+            meta_basenames.add(stem.removesuffix("_metadata"))
+    return [Path(p) for p, stem in json_files if stem not in meta_basenames]
 
 @asset(group_name="processing", non_argument_deps={"format_records"})
 def aggregate_records(context: AssetExecutionContext):
@@ -403,22 +583,35 @@ def aggregate_records(context: AssetExecutionContext):
         context.log.warning("No partition parquet files found to aggregate.")
         return
 
-    dfs = []
-    for p in part_files:
-        try:
-            table = pq.read_table(str(p))
-            dfs.append(table.to_pandas())
-        except Exception as e:
-            context.log.error(f"Failed to read partition file {p}: {e}")
-
-    if not dfs:
-        context.log.warning("No valid partition dataframes to aggregate.")
+    # Partitions are appended to the aggregated file one at a time as Arrow tables, so memory holds a single
+    # partition rather than the whole dataset, and no pandas copy is made. The file is written under a
+    # temporary name and moved into place once complete.
+    tmp_asset = AGGREGATED_ASSET.with_name(AGGREGATED_ASSET.name + ".tmp")
+    writer: Optional[pq.ParquetWriter] = None
+    total_rows = 0
+    try:
+        for p in part_files:
+            try:
+                table = pq.read_table(str(p))
+                if not table.schema.equals(RECORD_SCHEMA):
+                    table = table.cast(RECORD_SCHEMA)
+            except Exception as e:
+                context.log.error(f"Failed to read partition file {p}: {e}")
+                continue
+            if writer is None:
+                writer = pq.ParquetWriter(str(tmp_asset), RECORD_SCHEMA, **PARQUET_WRITE_OPTIONS)
+            writer.write_table(table)
+            total_rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        context.log.warning("No valid partition tables to aggregate.")
         return
 
-    combined = pd.concat(dfs, ignore_index=True)
-    table = pa.table(combined)
-    pq.write_table(table, str(AGGREGATED_ASSET))
-    context.log.info(f"Wrote aggregated dataset with {len(combined)} records to {AGGREGATED_ASSET}")
+    os.replace(tmp_asset, AGGREGATED_ASSET)
+    context.log.info(f"Wrote aggregated dataset with {total_rows} records to {AGGREGATED_ASSET}")
 
     # report missing partitions (use PARTITIONS_DEF if available)
     try:
@@ -449,10 +642,21 @@ def log_total_statistics(context: AssetExecutionContext):
         "data_file_not_found_count": 0,
         "unsupported_format_stats": {}
     }
-    for status_file in status_files:
+
+    def read_status(status_file: Path):
+        try:
+            return orjson.loads(status_file.read_bytes())
+        except Exception as e:
+            return e
+
+    # status files are small, so reading them is mostly file system latency; reads overlap on a thread pool
+    with ThreadPoolExecutor(max_workers=STATUS_READ_WORKERS) as executor:
+        statuses = list(executor.map(read_status, status_files))
+    for status_file, status in zip(status_files, statuses):
+        if isinstance(status, Exception):
+            context.log.error(f"Failed to read status file {status_file}: {status}")
+            continue
         try:
-            with status_file.open("r", encoding="utf-8") as fh:
-                status = json.load(fh)
             for key in total_stats.keys():
                 if key == "unsupported_format_stats":
                     for fmt, count in status.get(key, {}).items():
@@ -465,6 +669,59 @@ def log_total_statistics(context: AssetExecutionContext):
     context.log.info(f"Total statistics across all partitions: {total_stats}")
 
 
+@lru_cache(maxsize=8192)
+def _parquet_column_names(path: str) -> Tuple[str, ...]:
+    """Column names of a parquet file, from its footer only; cached as several records can share a data file."""
+    return tuple(pq.read_schema(path, memory_map=True).names)
+
+
+def _tag_input_row(context: AssetExecutionContext, row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the classifier input for one aggregated record: the start of the text for text records, or the
+    column names of the referenced parquet file(s) for parquet records.
+    """
+    fmt = (row.get("format") or "").lower()
+    identifier = row.get("identifier") or str(uuid4())
+    title = row.get("title", "")
+    description = row.get("description", "")
+
+    text_val = ""
+    if fmt == "text":
+        text_val = (row.get("text") or "")[:TAG_TEXT_CHARS]
+    elif fmt == "parquet":
+        # data_file is expected to be a relative path under STRUCTURED_DIR
+        data_file_rel = row.get("data_file") or ""
+        if data_file_rel:
+            data_path = STRUCTURED_DIR / data_file_rel
+            if data_path.exists() and data_path.is_file():
+                try:
+                    text_val = ", ".join(_parquet_column_names(str(data_path)))
+                except Exception as e:
+                    context.log.warning(f"Failed to read parquet schema from {data_path}: {e}")
+            elif data_path.exists() and data_path.is_dir():
+                # find up to first three parquet files in directory
+                parquet_candidates = sorted([p for p in data_path.glob("*.parquet")])
+                selected = parquet_candidates[:3]
+                col_names = []
+                for pfile in selected:
+                    try:
+                        col_names.extend(_parquet_column_names(str(pfile)))
+                    except Exception as e:
+                        context.log.warning(f"Failed reading parquet {pfile}: {e}")
+                text_val = ", ".join(set(col_names))
+            else:
+                context.log.warning(f"Referenced structured path not found: {data_path}")
+        else:
+            context.log.warning(f"No data_file reference for parquet-format record id={identifier}")
+
+    return {
+        "identifier": identifier,
+        "title": title,
+        "description": description,
+        "text": text_val
+    }
+
+
 # New asset to tag dataset records using the EU theme classifier
 @asset(group_name="processing", non_argument_deps={"aggregate_records"})
 def tagged_data(context: AssetExecutionContext):
@@ -479,57 +736,23 @@ def tagged_data(context: AssetExecutionContext):
         context.log.warning(f"Source dataset not found at {AGGREGATED_ASSET}; nothing to tag.")
         return
 
-    df = pd.read_parquet(str(AGGREGATED_ASSET))
-
+    # Only the columns the classifier input is built from are read, batch by batch, and the text is cut to
+    # TAG_TEXT_CHARS in Arrow so full texts are never turned into Python strings
+    aggregated = pq.ParquetFile(str(AGGREGATED_ASSET))
+    columns = [name for name in TAG_INPUT_COLUMNS if name in aggregated.schema_arrow.names]
     to_tag_rows = []
-    for i, row in df.iterrows():
-        try:
-            fmt = (row.get("format") or "").lower()
-            identifier = row.get("identifier") or str(uuid4())
-            title = row.get("title", "")
-            description = row.get("description", "")
-
-            text_val = ""
-            if fmt == "text":
-                text_val = (row.get("text") or "")[:3000]
-            elif fmt == "parquet":
-                # data_file is expected to be a relative path under STRUCTURED_DIR
-                data_file_rel = row.get("data_file") or ""
-                if data_file_rel:
-                    data_path = STRUCTURED_DIR / data_file_rel
-                    if data_path.exists() and data_path.is_file():
-                        try:
-                            parquet_file = pq.ParquetFile(str(data_path))
-                            cols = parquet_file.schema_arrow.names
-                            text_val = ", ".join(cols)
-                        except Exception as e:
-                            context.log.warning(f"Failed to read parquet schema from {data_path}: {e}")
-                    elif data_path.exists() and data_path.is_dir():
-                        # find up to first three parquet files in directory
-                        parquet_candidates = sorted([p for p in data_path.glob("*.parquet")])
-                        selected = parquet_candidates[:3]
-                        col_names = []
-                        for pfile in selected:
-                            try:
-                                pf = pq.ParquetFile(str(pfile))
-                                col_names.extend(pf.schema_arrow.names)
-                            except Exception as e:
-                                context.log.warning(f"Failed reading parquet {pfile}: {e}")
-                        text_val = ", ".join(set(col_names))
-                    else:
-                        context.log.warning(f"Referenced structured path not found: {data_path}")
-                else:
-                    context.log.warning(f"No data_file reference for parquet-format record id={identifier}")
-
-            to_tag_rows.append({
-                "identifier": identifier,
-                "title": title,
-                "description": description,
-                "text": text_val
-            })
-        except Exception as exc:
-            context.log.error(f"Failed preparing record for tagging (index {i}): {exc}")
-            continue
+    i = 0
+    for batch in aggregated.iter_batches(batch_size=PARQUET_BATCH_ROWS, columns=columns):
+        if "text" in columns:
+            text_index = batch.schema.get_field_index("text")
+            batch = batch.set_column(text_index, "text",
+                                     pc.utf8_slice_codeunits(batch.column(text_index), 0, TAG_TEXT_CHARS))
+        for row in batch.to_pylist():
+            try:
+                to_tag_rows.append(_tag_input_row(context, row))
+            except Exception as exc:
+                context.log.error(f"Failed preparing record for tagging (index {i}): {exc}")
+            i += 1
 
     to_tag_df = pd.DataFrame(to_tag_rows)
 
@@ -540,31 +763,36 @@ def tagged_data(context: AssetExecutionContext):
         context.log.error(f"EU theme classifier failed: {e}")
         return
 
-    # Merge predicted themes back into original dataframe (overwrite tags column)
+    # Merge predicted themes back into the dataset (overwrite tags column). The lookup by identifier runs in Arrow
+    # (index_in + take) so the dataset is never copied through pandas. Tags are written as JSON strings, and
+    # records without a prediction keep their existing tags in the same form.
     try:
-        preds = classified.set_index("identifier")["predicted_themes"].apply(lambda x: json.dumps(x) if x is not None else None).to_dict()
-        df_tagged = df.copy()
-
-        # Use explicit column checks
-        if "identifier" in df_tagged.columns:
-            id_series = df_tagged["identifier"]
+        table = pq.read_table(str(AGGREGATED_ASSET))
+        # the last prediction wins for a repeated identifier, as with a dict keyed by identifier
+        classified = classified.drop_duplicates(subset="identifier", keep="last")
+        pred_ids = pa.array(classified["identifier"], type=pa.string())
+        pred_tags = pa.array([orjson.dumps(x).decode("utf-8") if x is not None else None
+                              for x in classified["predicted_themes"]], type=pa.string())
+        if "identifier" in table.column_names:
+            mapped = pc.take(pred_tags, pc.index_in(table["identifier"], value_set=pred_ids))
         else:
-            id_series = pd.Series([None] * len(df_tagged), index=df_tagged.index)
-        mapped = id_series.map(preds)
-        if "tags" in df_tagged.columns:
-            existing_tags = df_tagged["tags"]
+            mapped = pa.nulls(table.num_rows, type=pa.string())
+        if mapped.null_count and "tags" in table.column_names:
+            existing_tags = [orjson.dumps(tags).decode("utf-8") if tags is not None else None
+                             for tags in table["tags"].to_pylist()]
+            mapped = pc.coalesce(mapped, pa.array(existing_tags, type=pa.string()))
+        if "tags" in table.column_names:
+            table = table.set_column(table.schema.get_field_index("tags"), "tags", mapped)
         else:
-            existing_tags = pd.Series([None] * len(df_tagged), index=df_tagged.index)
-        df_tagged["tags"] = mapped.fillna(existing_tags)
+            table = table.append_column("tags", mapped)
     except Exception as e:
         context.log.error(f"Failed merging classifier output into dataset: {e}")
         return
 
     # Write out tagged parquet
     try:
-        table = pa.table(df_tagged)
-        pq.write_table(table, str(TAGGED_ASSET))
-        context.log.info(f"Wrote tagged dataset with {len(df_tagged)} records to {TAGGED_ASSET}")
+        pq.write_table(table, str(TAGGED_ASSET), **PARQUET_WRITE_OPTIONS)
+        context.log.info(f"Wrote tagged dataset with {table.num_rows} records to {TAGGED_ASSET}")
     except Exception as e:
         context.log.error(f"Failed to write tagged parquet to {TAGGED_ASSET}: {e}")
 
@@ -599,6 +827,6 @@ def anonymize_text_asset(context: AssetExecutionContext):
     df_out = run_batch_process(df)
 
     # Write the anonymized dataset to the output path
-    df_out.to_parquet(FINAL_ASSET, index=False)
+    df_out.to_parquet(FINAL_ASSET, index=False, **PARQUET_WRITE_OPTIONS)
     context.log.info(f"Anonymized dataset written to {FINAL_ASSET}")
 
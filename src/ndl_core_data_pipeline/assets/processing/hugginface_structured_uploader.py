@@ -1,4 +1,4 @@
-from huggingface_hub import HfApi
+from huggingface_hub import HfApi, CommitOperationDelete
 from pathlib import Path
 
 CURRENT_DIR = Path(__file__).parent
@@ -7,30 +7,45 @@ STRUCTURED_FOLDER = "structured"
 STRUCTURED_PATH = TARGET_DIR / STRUCTURED_FOLDER
 
 REPO_ID = "theodi/ndl-core-structured-data"
+UPLOAD_WORKERS = 8  # concurrent hashing / upload workers of upload_large_folder
 
 
-def delete_all_except_readme():
-    """Delete all files from the HuggingFace dataset except README.md"""
+def local_structured_files() -> set:
+    """Paths, relative to target/structured, of the files upload_large_folder uploads from it"""
+    return {
+        path.relative_to(STRUCTURED_PATH).as_posix()
+        for path in STRUCTURED_PATH.rglob("*")
+        if path.is_file() and path.relative_to(STRUCTURED_PATH).parts[0] not in (".cache", ".git")
+    }
+
+
+def delete_files_missing_locally():
+    """Delete the files of the HuggingFace dataset that are no longer in target/structured, except README.md"""
     api = HfApi()
 
     # List all files in the repository
     repo_files = api.list_repo_files(repo_id=REPO_ID, repo_type="dataset")
 
-    # Filter out README.md and .gitattributes (keep these)
-    files_to_delete = [f for f in repo_files if f not in ["README.md", ".gitattributes", ".gitignore"]]
+    # Keep README.md, .gitattributes, .gitignore and every file that is still uploaded. Files that did not change
+    # are skipped by upload_large_folder (its resume metadata in structured/.cache marks them committed), so they
+    # must not be deleted from the repo either
+    local_files = local_structured_files()
+    files_to_delete = [f for f in repo_files
+                       if f not in ["README.md", ".gitattributes", ".gitignore"] and f not in local_files]
 
     if not files_to_delete:
-        print("No files to delete (only README.md found).")
+        print("No stale files to delete.")
         return
 
-    print(f"Deleting {len(files_to_delete)} files from {REPO_ID}...")
+    print(f"Deleting {len(files_to_delete)} stale files from {REPO_ID}...")
 
-    # Delete files in batches using delete_files
-    api.delete_files(
+    # One commit with an explicit delete per file; passing the names as delete_patterns would match every
+    # pattern against every file in the repo, and treat names containing [ ] * ? as globs
+    api.create_commit(
         repo_id=REPO_ID,
         repo_type="dataset",
-        delete_patterns=files_to_delete,
-        commit_message="Delete all files except README.md before re-upload"
+        operations=[CommitOperationDelete(path_in_repo=f) for f in files_to_delete],
+        commit_message="Delete files no longer in the structured data"
     )
 
     print(f"✅ Deleted {len(files_to_delete)} files.")
@@ -46,28 +61,33 @@ def upload_structured_data():
 
     print(f"Uploading structured data from {STRUCTURED_PATH} to {REPO_ID}...")
 
-    api.upload_folder(
+    # upload_large_folder hashes and uploads files on several workers, commits them in chunks and can resume
+    # an interrupted upload, where upload_folder sends everything in one sequential commit
+    api.upload_large_folder(
         folder_path=STRUCTURED_PATH,
         repo_id=REPO_ID,
         repo_type="dataset",
-        commit_message="Upload structured data files",
+        num_workers=UPLOAD_WORKERS,
     )
 
     print("\n🎉 Upload Complete!")
 
 
 def main():
-    """Main function to delete existing content and upload new structured data"""
+    """Main function to upload new structured data and delete stale content"""
     print(f"Starting upload process for {REPO_ID}")
     print(f"Source folder: {STRUCTURED_PATH}")
     print("-" * 50)
 
-    # Step 1: Delete all existing content except README.md
-    delete_all_except_readme()
+    if not STRUCTURED_PATH.exists():
+        print(f"❌ Error: Structured data folder not found at {STRUCTURED_PATH}")
+        return
+
+    # Step 1: Upload new and changed structured data
+    upload_structured_data()
 
-    # THis operation is extremely slow, clone the reo and commit several folders at once
-    # Step 2: Upload new structured data
-    # upload_structured_data()
+    # Step 2: Delete remote files that are no longer produced locally
+    delete_files_missing_locally()
 
     print("-" * 50)
     print("✅ Process complete!")
@@ -1,61 +1,216 @@
+import hashlib
+import math
 import os
 import shutil
+from typing import Iterator, Optional
 from dagster import asset
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pathlib import Path
 from sentence_transformers import SentenceTransformer
 import lancedb
+import torch
 
 CURRENT_DIR = Path(__file__).parent
 TARGET_DIR = (CURRENT_DIR / "../../../../target").resolve()
 SOURCE_PARQUET = TARGET_DIR / "ndl_core_dataset.parquet"
 LANCEDB_PATH = TARGET_DIR / "lancedb_search_index"
+LANCEDB_BUILD_PATH = TARGET_DIR / "lancedb_search_index.tmp"
+EMBEDDING_CACHE_PATH = TARGET_DIR / "embedding_cache.parquet"
 
 MODEL_NAME = 'all-MiniLM-L6-v2'
-model = SentenceTransformer(MODEL_NAME)
+SOURCE_BATCH_ROWS = 8192  # source records read, embedded and written per batch
+SEARCH_TEXT_PREVIEW_CHARS = 500  # characters of a record's text included in its search text
 
+# Record columns stored in the LanceDB table next to the vector
+LANCEDB_STRING_COLUMNS = ['identifier', 'title', 'description', 'source', 'date', 'collection_time', 'open_type',
+                          'license', 'tags', 'language', 'format', 'text', 'data_file']
+LANCEDB_INT_COLUMNS = ['word_count', 'token_count']
 
-def generate_search_text(row: pd.Series) -> str:
+# Vector index sizing: rows per IVF partition and vector dimensions per PQ sub-vector
+INDEX_PARTITION_SIZE = 4096
+INDEX_DIMENSIONS_PER_SUB_VECTOR = 16
+
+# SentenceTransformer backend: "torch" (default), or "onnx" / "openvino" for optimized inference when
+# sentence-transformers[onnx] / [openvino] is installed
+EMBEDDING_BACKEND = os.environ.get("NDL_EMBEDDING_BACKEND", "torch")
+EMBEDDING_DEVICE = 'cuda' if torch.cuda.is_available() else 'cpu'
+EMBEDDING_BATCH_SIZE = 256  # texts encoded per forward pass
+model = SentenceTransformer(MODEL_NAME, device=EMBEDDING_DEVICE, backend=EMBEDDING_BACKEND)
+if EMBEDDING_DEVICE == 'cuda' and EMBEDDING_BACKEND == 'torch':
+    # half precision on GPU; vectors are cast back to float32 after encoding
+    model.half()
+
+
+def generate_search_text(df: pd.DataFrame) -> pd.Series:
     """
-    Generate a search text combining title, description, and first 500 characters of text.
+    Generate the search text of every record: title, description and the first 500 characters of text,
+    each stripped and joined with a space, leaving out empty parts. Built with vectorized string operations
+    over whole columns.
 
     Args:
-        row: A pandas Series representing a single record.
+        df: The records.
 
     Returns:
-        A combined search text string.
+        A Series of search text strings aligned with df.
     """
-    parts = []
+    search_text = pd.Series("", index=df.index, dtype=object)
+    for column, max_chars in (("title", None), ("description", None), ("text", SEARCH_TEXT_PREVIEW_CHARS)):
+        if column not in df.columns:
+            continue
+        part = df[column].fillna("").astype(str)
+        if max_chars is not None:
+            part = part.str.slice(0, max_chars)
+        part = part.str.strip()
+        # non-empty parts are followed by a separating space, the last one is stripped below
+        search_text = search_text + part.where(part.str.len() == 0, part + " ")
+    return search_text.str.rstrip()
 
-    title = row.get('title', '')
-    if title and pd.notna(title):
-        parts.append(str(title).strip())
 
-    description = row.get('description', '')
-    if description and pd.notna(description):
-        parts.append(str(description).strip())
+def generate_embeddings(texts: list[str]) -> np.ndarray:
+    """
+    Generate normalized embeddings for a list of texts using SentenceTransformer.
 
-    text = row.get('text', '')
-    if text and pd.notna(text):
-        text_preview = str(text)[:500].strip()
-        if text_preview:
-            parts.append(text_preview)
+    Args:
+        texts: List of text strings to embed.
 
-    return " ".join(parts)
+    Returns:
+        A contiguous float32 array with one embedding vector per row.
+    """
+    with torch.inference_mode():
+        embeddings = model.encode(texts, batch_size=EMBEDDING_BATCH_SIZE, convert_to_numpy=True,
+                                  normalize_embeddings=True, show_progress_bar=True)
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
 
 
-def generate_embeddings(texts: list[str]) -> list[list[float]]:
+class EmbeddingCache:
+    """
+    Embeddings of earlier runs keyed by a hash of the model name and search text, stored as float16 in a
+    parquet file so records whose search text did not change are not encoded again. Only the entries used
+    by the current run are written back by save().
     """
-    Generate embeddings for a list of texts using SentenceTransformer.
+
+    def __init__(self, path: Path, dimension: int):
+        self.path = path
+        self.dimension = dimension
+        self.reused = 0
+        self.encoded = 0
+        self._rows: dict[bytes, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._keys: list[bytes] = []
+        self._run_vectors: list[np.ndarray] = []
+        if not path.exists():
+            return
+        try:
+            table = pq.read_table(path)
+            keys = table.column('key').to_pylist()
+            vectors = table.column('vector').combine_chunks().flatten().to_numpy()
+            vectors = vectors.reshape(len(keys), -1) if keys else vectors.reshape(0, dimension)
+        except Exception as e:
+            print(f"Ignoring unreadable embedding cache {path}: {e}")
+            return
+        if vectors.shape[1] != dimension:
+            print(f"Ignoring embedding cache {path} with dimension {vectors.shape[1]}")
+            return
+        self._rows = {key: row for row, key in enumerate(keys)}
+        self._vectors = vectors
+        print(f"Loaded {len(keys)} cached embeddings from {path}")
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.blake2b(f"{MODEL_NAME}\0{text}".encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Embeddings of texts, taken from the cache where present and generated for the rest.
+
+        Args:
+            texts: List of text strings to embed.
+
+        Returns:
+            A float32 array with one embedding vector per text.
+        """
+        keys = [self.key(text) for text in texts]
+        rows = [self._rows.get(key) for key in keys]
+        hits = [i for i, row in enumerate(rows) if row is not None]
+        misses = [i for i, row in enumerate(rows) if row is None]
+
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        if hits:
+            # float16 rounding moves cached vectors off unit length; restore it, as the index ranks by dot product
+            cached = self._vectors[[rows[i] for i in hits]].astype(np.float32)
+            embeddings[hits] = cached / np.linalg.norm(cached, axis=1, keepdims=True)
+        if misses:
+            embeddings[misses] = generate_embeddings([texts[i] for i in misses])
+        self.reused += len(hits)
+        self.encoded += len(misses)
+
+        self._keys.extend(keys)
+        self._run_vectors.append(embeddings.astype(np.float16))
+        return embeddings
+
+    def save(self):
+        """Write the embeddings used by this run to the cache file, replacing it."""
+        vectors = np.concatenate(self._run_vectors) if self._run_vectors else np.empty((0, self.dimension), np.float16)
+        table = pa.table({
+            'key': pa.array(self._keys, type=pa.binary(16)),
+            'vector': pa.FixedSizeListArray.from_arrays(pa.array(vectors.reshape(-1)), self.dimension),
+        })
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self.path)
+        print(f"Embedding cache: {self.reused} reused, {self.encoded} encoded, saved to {self.path}")
+
+
+def lancedb_schema(dimension: int) -> pa.Schema:
+    """
+    Schema of the LanceDB table: the record columns followed by the embedding vector.
 
     Args:
-        texts: List of text strings to embed.
+        dimension: Embedding dimension.
 
     Returns:
-        List of embedding vectors.
+        The Arrow schema.
     """
-    embeddings = model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
-    return embeddings.tolist()
+    fields = [pa.field(name, pa.string()) for name in LANCEDB_STRING_COLUMNS]
+    fields += [pa.field(name, pa.int64()) for name in LANCEDB_INT_COLUMNS]
+    fields.append(pa.field('vector', pa.list_(pa.float32(), dimension)))
+    return pa.schema(fields)
+
+
+def generate_lancedb_batches(source: pq.ParquetFile, stats: dict,
+                             cache: EmbeddingCache) -> Iterator[pa.RecordBatch]:
+    """
+    Read the source records batch by batch, keep those with a search text and yield them with their
+    embeddings as LanceDB record batches, so only one batch is held in memory at a time.
+
+    Args:
+        source: The NDL core dataset parquet file.
+        stats: Counters updated in place with total_records and indexed_records.
+        cache: Embedding cache the embeddings are looked up in and recorded to.
+
+    Yields:
+        Record batches matching lancedb_schema.
+    """
+    for batch in source.iter_batches(batch_size=SOURCE_BATCH_ROWS, columns=LANCEDB_STRING_COLUMNS + LANCEDB_INT_COLUMNS):
+        df = batch.to_pandas()
+        stats["total_records"] += len(df)
+        search_text = generate_search_text(df)
+        valid = search_text.str.len() > 0
+        df = df[valid]
+        if df.empty:
+            continue
+
+        embeddings = cache.embed(search_text[valid].tolist())
+        stats["indexed_records"] += len(df)
+
+        # Convert all columns to appropriate types for LanceDB, whole columns at a time; missing values become '' or 0
+        columns = [pa.array(df[name].fillna('').astype(str), type=pa.string()) for name in LANCEDB_STRING_COLUMNS]
+        columns += [pa.array(df[name].fillna(0).astype('int64'), type=pa.int64()) for name in LANCEDB_INT_COLUMNS]
+        columns.append(pa.FixedSizeListArray.from_arrays(pa.array(embeddings.reshape(-1)), embeddings.shape[1]))
+        yield pa.RecordBatch.from_arrays(columns, schema=lancedb_schema(embeddings.shape[1]))
 
 
 @asset(group_name="rag")
@@ -64,96 +219,96 @@ def create_lancedb_index():
     Creates a LanceDB vector search index from the NDL core dataset.
 
     This asset:
-    1. Reads the ndl_core_dataset.parquet file
+    1. Reads the ndl_core_dataset.parquet file in batches
     2. Generates search_text for each record (title + description + text[:500])
     3. Creates embeddings for all search texts
     4. Stores all data with embeddings in LanceDB
     5. Creates a vector search index on the embeddings
     """
     print(f"Reading source parquet from: {SOURCE_PARQUET}")
-    df = pd.read_parquet(SOURCE_PARQUET)
-    print(f"Loaded {len(df)} records")
+    source = pq.ParquetFile(SOURCE_PARQUET)
+    print(f"Found {source.metadata.num_rows} records")
 
-    # Generate search text for each record
-    print("Generating search text for each record...")
-    df['search_text'] = df.apply(generate_search_text, axis=1)
+    # Build the new database next to the current one, which is only replaced once the new index is complete
+    if os.path.exists(LANCEDB_BUILD_PATH):
+        shutil.rmtree(LANCEDB_BUILD_PATH)
+    os.makedirs(LANCEDB_BUILD_PATH)
+    try:
+        result = build_lancedb_index(source)
+    except BaseException:
+        shutil.rmtree(LANCEDB_BUILD_PATH, ignore_errors=True)
+        raise
+    finally:
+        source.close()
 
-    # Filter out records with empty search text
-    df_valid = df[df['search_text'].str.len() > 0].copy()
-    print(f"Records with valid search text: {len(df_valid)}")
+    if os.path.exists(LANCEDB_PATH):
+        print(f"🗑️  Replacing old database folder: {LANCEDB_PATH}...")
+        old_path = LANCEDB_PATH.with_name(LANCEDB_PATH.name + ".old")
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path)
+        os.replace(LANCEDB_PATH, old_path)
+        os.replace(LANCEDB_BUILD_PATH, LANCEDB_PATH)
+        shutil.rmtree(old_path)
+    else:
+        os.replace(LANCEDB_BUILD_PATH, LANCEDB_PATH)
 
-    if len(df_valid) == 0:
-        raise ValueError("No records with valid search text found")
+    print(f"LanceDB index saved to: {LANCEDB_PATH}")
 
-    # Generate embeddings
-    print("Generating embeddings...")
-    search_texts = df_valid['search_text'].tolist()
-    embeddings = generate_embeddings(search_texts)
-    df_valid['vector'] = embeddings
-
-    print(f"Generated {len(embeddings)} embeddings with dimension {len(embeddings[0])}")
-
-    # Prepare data for LanceDB
-    # Convert all columns to appropriate types for LanceDB
-    lancedb_data = []
-    for idx, row in df_valid.iterrows():
-        record = {
-            'identifier': str(row['identifier']) if pd.notna(row['identifier']) else '',
-            'title': str(row['title']) if pd.notna(row['title']) else '',
-            'description': str(row['description']) if pd.notna(row['description']) else '',
-            'source': str(row['source']) if pd.notna(row['source']) else '',
-            'date': str(row['date']) if pd.notna(row['date']) else '',
-            'collection_time': str(row['collection_time']) if pd.notna(row['collection_time']) else '',
-            'open_type': str(row['open_type']) if pd.notna(row['open_type']) else '',
-            'license': str(row['license']) if pd.notna(row['license']) else '',
-            'tags': str(row['tags']) if pd.notna(row['tags']) else '',
-            'language': str(row['language']) if pd.notna(row['language']) else '',
-            'format': str(row['format']) if pd.notna(row['format']) else '',
-            'text': str(row['text']) if pd.notna(row['text']) else '',
-            'word_count': int(row['word_count']) if pd.notna(row['word_count']) else 0,
-            'token_count': int(row['token_count']) if pd.notna(row['token_count']) else 0,
-            'data_file': str(row['data_file']) if pd.notna(row['data_file']) else '',
-            # 'extra_metadata': str(row['extra_metadata']) if pd.notna(row['extra_metadata']) else '',
-            # 'search_text': str(row['search_text']),
-            'vector': row['vector'],
-        }
-        lancedb_data.append(record)
+    return result
 
-    if os.path.exists(LANCEDB_PATH):
-        print(f"🗑️  Deleting old database folder: {LANCEDB_PATH}...")
-        shutil.rmtree(LANCEDB_PATH)
-    os.makedirs(LANCEDB_PATH, exist_ok=True)
 
-    # Create LanceDB database and table
-    print(f"Creating LanceDB at: {LANCEDB_PATH}")
-    db = lancedb.connect(str(LANCEDB_PATH))
+def build_lancedb_index(source: pq.ParquetFile) -> dict:
+    """
+    Create the LanceDB table and its vector search index in LANCEDB_BUILD_PATH.
+
+    Args:
+        source: The NDL core dataset parquet file.
 
-    # Drop existing table if it exists
+    Returns:
+        The asset result: record counts, embedding dimension, database path and table name.
+
+    Raises:
+        ValueError: If no record has a search text.
+    """
+    print(f"Creating LanceDB at: {LANCEDB_BUILD_PATH}")
+    db = lancedb.connect(str(LANCEDB_BUILD_PATH))
     table_name = "ndl_core_datasets"
-    if table_name in db.table_names():
-        db.drop_table(table_name)
-        print(f"Dropped existing table: {table_name}")
 
-    # Create table with data
-    table = db.create_table(table_name, lancedb_data, mode="overwrite")
-    print(f"Created table '{table_name}' with {len(lancedb_data)} records")
+    # Create table with data, streaming search text, embeddings and columns one source batch at a time
+    print("Generating search text and embeddings...")
+    stats = {"total_records": 0, "indexed_records": 0}
+    dimension = model.get_sentence_embedding_dimension()
+    cache = EmbeddingCache(EMBEDDING_CACHE_PATH, dimension)
+    # a reader rather than the bare generator, so a source without any valid record gives an empty table
+    batches = pa.RecordBatchReader.from_batches(lancedb_schema(dimension),
+                                                generate_lancedb_batches(source, stats, cache))
+    table = db.create_table(table_name, data=batches, mode="overwrite")
+    num_embeddings = stats["indexed_records"]
+    print(f"Records with valid search text: {num_embeddings}")
 
-    # Create vector search index for faster similarity search
-    print("Creating vector search index...")
+    if num_embeddings == 0:
+        raise ValueError("No records with valid search text found")
+
+    print(f"Created table '{table_name}' with {num_embeddings} records, embedding dimension {dimension}")
+
+    # Partitions grow with the table (capped at sqrt(N)) instead of being fixed
+    num_partitions = int(min(max(num_embeddings / INDEX_PARTITION_SIZE, 1), math.isqrt(num_embeddings)))
+    num_sub_vectors = max(dimension // INDEX_DIMENSIONS_PER_SUB_VECTOR, 1)
+    print(f"Creating vector search index ({num_partitions} partitions, {num_sub_vectors} sub-vectors)...")
+    # Embeddings are normalized, so the dot product ranks like cosine without the per-vector norms
     table.create_index(
-        metric="cosine",
-        num_partitions=256,
-        num_sub_vectors=96,
+        metric="dot",
+        num_partitions=num_partitions,
+        num_sub_vectors=num_sub_vectors,
         replace=True
     )
     print("Vector search index created successfully")
-
-    print(f"LanceDB index saved to: {LANCEDB_PATH}")
+    cache.save()
 
     return {
-        "total_records": len(df),
-        "indexed_records": len(lancedb_data),
-        "embedding_dimension": len(embeddings[0]) if embeddings else 0,
+        "total_records": stats["total_records"],
+        "indexed_records": num_embeddings,
+        "embedding_dimension": dimension,
         "lancedb_path": str(LANCEDB_PATH),
         "table_name": table_name,
     }
@@ -25,6 +25,8 @@ def upload():
     # 2. Upload with Force (Fixes the LFS Pointer issue)
     api = HfApi()
 
+    # upload_folder only walks the index folder. File contents go through the Xet storage backend (hf_xet, a
+    # huggingface_hub dependency), which uploads chunks concurrently
     api.upload_folder(
         folder_path=LANCEDB_PATH,
         path_in_repo=LOCAL_FOLDER,  # Uploads to root/lancedb_search_index/
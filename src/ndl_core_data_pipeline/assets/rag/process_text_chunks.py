@@ -1,3 +1,5 @@
+import math
+import os
 from dagster import asset
 import pandas as pd
 from pathlib import Path
@@ -18,7 +20,17 @@ FINAL_ASSET = TARGET_DIR / "ndl_core_dataset.parquet"
 RAG_ASSET = TARGET_DIR / "ndl_core_rag_index.parquet"
 FAISS_FILE = TARGET_DIR / "index.faiss"
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# Indexes with at least FAISS_IVF_MIN_VECTORS vectors use IVF-PQ, smaller ones an exact flat index
+FAISS_IVF_MIN_VECTORS = 10000
+FAISS_IVF_PARTITION_SIZE = 4096  # vectors per IVF list
+FAISS_PQ_DIMENSIONS_PER_SUB_VECTOR = 16
+FAISS_PQ_BITS = 8
+
+# SentenceTransformer backend: "torch" (default), or "onnx" / "openvino" for optimized inference when
+# sentence-transformers[onnx] / [openvino] is installed
+EMBEDDING_BACKEND = os.environ.get("NDL_EMBEDDING_BACKEND", "torch")
+
+model = SentenceTransformer('all-MiniLM-L6-v2', backend=EMBEDDING_BACKEND)
 
 @asset(
     group_name="rag"
@@ -97,15 +109,24 @@ def create_faiss_index(embeddings, ids, file_path):
     if embeddings_np.shape[0] != ids_np.shape[0]:
         raise ValueError("The number of embeddings must match the number of IDs.")
 
-    # Create FAISS index
-    dimension = embeddings_np.shape[1]
-    index = faiss.IndexFlatL2(dimension)
+    # Create FAISS index; IVF-PQ scans only the nearest lists of compressed vectors at query time
+    num_vectors, dimension = embeddings_np.shape
+    quantizer = faiss.IndexFlatL2(dimension)
+    if num_vectors >= FAISS_IVF_MIN_VECTORS and dimension % FAISS_PQ_DIMENSIONS_PER_SUB_VECTOR == 0:
+        nlist = int(min(max(num_vectors / FAISS_IVF_PARTITION_SIZE, 1), math.isqrt(num_vectors)))
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, dimension // FAISS_PQ_DIMENSIONS_PER_SUB_VECTOR,
+                                 FAISS_PQ_BITS)
+    else:
+        index = quantizer
     index_with_ids = faiss.IndexIDMap2(index)  # Use IndexIDMap2 for better compatibility
 
     # Debugging: Print shapes and types
     print(f"Embeddings shape: {embeddings_np.shape}, dtype: {embeddings_np.dtype}")
     print(f"IDs shape: {ids_np.shape}, dtype: {ids_np.dtype}")
 
+    if not index_with_ids.is_trained:
+        print(f"Training IVF-PQ index with {index.nlist} lists")
+        index_with_ids.train(embeddings_np)
     index_with_ids.add_with_ids(embeddings_np, ids_np)
 
     # Save the FAISS index
@@ -2,6 +2,7 @@ import lancedb
 from sentence_transformers import SentenceTransformer
 from pathlib import Path
 import os
+from functools import lru_cache
 
 CURRENT_DIR = Path(__file__).parent
 TARGET_DIR = (CURRENT_DIR / "../../../../target").resolve()
@@ -12,6 +13,18 @@ MODEL_NAME = "all-MiniLM-L6-v2"
 QUERY = "Police use of force"
 
 
+@lru_cache(maxsize=1)
+def get_model() -> SentenceTransformer:
+    """Query encoder, loaded once and reused by later searches."""
+    return SentenceTransformer(MODEL_NAME)
+
+
+@lru_cache(maxsize=1)
+def get_table():
+    """The LanceDB search table, opened once and reused by later searches."""
+    return lancedb.connect(LANCEDB_PATH).open_table(TABLE_NAME)
+
+
 def run_test():
     if not os.path.exists(LANCEDB_PATH):
         print(f"Error: Database folder '{LANCEDB_PATH}' not found.")
@@ -19,15 +32,14 @@ def run_test():
 
     print(f"Loading model '{MODEL_NAME}'...")
     try:
-        model = SentenceTransformer(MODEL_NAME)
+        model = get_model()
     except Exception as e:
         print(f"Error loading model: {e}")
         return
 
     print(f"Connecting to LanceDB at '{LANCEDB_PATH}'...")
     try:
-        db = lancedb.connect(LANCEDB_PATH)
-        table = db.open_table(TABLE_NAME)
+        table = get_table()
     except Exception as e:
         print(f"Error opening table: {e}")
         print("   Did you rename the folder correctly to 'lancedb_search_index'?")
@@ -35,7 +47,7 @@ def run_test():
 
     # Perform Search
     print(f"Searching for: '{QUERY}'")
-    query_vector = model.encode(QUERY)
+    query_vector = model.encode(QUERY, normalize_embeddings=True)
 
     # Get list of columns to return (Everything EXCEPT 'vector')
     # This prevents the massive vector array from cluttering your screen
@@ -43,7 +55,7 @@ def run_test():
 
     results = (
         table.search(query_vector)
-        .metric("cosine")
+        .metric("dot")
         .select(columns_to_show)  # <--- Filter out the vector column
         .limit(3)  # <--- Return top 3 results
         .to_pandas()
@@ -1,10 +1,13 @@
+import os
+
 from dagster import (
     Definitions,
     load_assets_from_package_module,
     define_asset_job,
     SkipReason,
     RunRequest,
-    SensorDefinition
+    SensorDefinition,
+    multiprocess_executor,
 )
 from markdown_it.common.html_re import processing
 
@@ -15,9 +18,15 @@ from ndl_core_data_pipeline.assets.gov_uk.assets import gov_uk_batches, gov_uk_s
 from ndl_core_data_pipeline.assets.data_gov_uk.assets import (
     data_gov_discover_categories,
     data_gov_process_category,
+    data_gov_process_package,
     data_gov_categories,
+    data_gov_packages,
 )
 
+# Search/discovery responses are revalidated against this cache on re-runs (see RateLimitedApiClient.get)
+API_CACHE_PATH = "cache/api_cache.sqlite"
+# legislation.gov.uk feed pages and documents are only cached when NDL_HTTP_CACHE=1, as the cache keeps every document body
+LEGISLATION_CACHE_PATH = API_CACHE_PATH if os.environ.get("NDL_HTTP_CACHE") == "1" else None
 
 all_assets = load_assets_from_package_module(
     package_module=assets_package
@@ -25,6 +34,11 @@ all_assets = load_assets_from_package_module(
 
 batch_job = define_asset_job("gov_uk_batch_job", selection=[gov_uk_process_batch])
 data_gov_job = define_asset_job("data_gov_batch_job", selection=[data_gov_process_category])
+data_gov_package_job = define_asset_job(
+    "data_gov_package_job",
+    selection=[data_gov_process_package],
+    executor_def=multiprocess_executor.configured({"max_concurrent": 16}),
+)
 
 processing_pipeline = define_asset_job(
     name="processing_pipeline",
@@ -70,17 +84,39 @@ def data_gov_sensor(context):
         partition_keys=keys,
     )
 
+
+def data_gov_package_sensor(context):
+    """
+    Sensor that requests one data_gov package job run per package partition.
+    Packages are requested only once (run_key is the partition key), so new packages are picked up as
+    the category runs register them.
+    """
+    keys = context.instance.get_dynamic_partitions(data_gov_packages.name)
+
+    if not keys:
+        return SkipReason("No data_gov package partitions found yet")
+
+    return [
+        RunRequest(
+            run_key=key,
+            job_name="data_gov_package_job",
+            partition_key=key,
+        )
+        for key in keys
+    ]
+
 defs = Definitions(
     assets=all_assets,
-    jobs=[batch_job, data_gov_job, processing_pipeline],
+    jobs=[batch_job, data_gov_job, data_gov_package_job, processing_pipeline],
     sensors=[
         SensorDefinition(name="trigger_gov_uk_batches", evaluation_fn=gov_uk_sensor, job=batch_job),
         SensorDefinition(name="trigger_data_gov_categories", evaluation_fn=data_gov_sensor, job=data_gov_job),
+        SensorDefinition(name="trigger_data_gov_packages", evaluation_fn=data_gov_package_sensor, job=data_gov_package_job),
     ],
     resources={
-        "api_gov_uk": RateLimitedApiClient(base_url="https://www.gov.uk", rate_limit_per_second=10.0),
-        "api_data_gov": RateLimitedApiClient(base_url="https://data.gov.uk", rate_limit_per_second=None),
-        "api_legislation": RateLimitedApiClient(base_url="https://www.legislation.gov.uk", rate_limit_per_second=None),
+        "api_gov_uk": RateLimitedApiClient(base_url="https://www.gov.uk", rate_limit_per_second=10.0, cache_path=API_CACHE_PATH),
+        "api_data_gov": RateLimitedApiClient(base_url="https://data.gov.uk", rate_limit_per_second=None, cache_path=API_CACHE_PATH),
+        "api_legislation": RateLimitedApiClient(base_url="https://www.legislation.gov.uk", rate_limit_per_second=None, cache_path=LEGISLATION_CACHE_PATH),
         "api_ons": RateLimitedApiClient(base_url="https://api.beta.ons.gov.uk", rate_limit_per_second=10.0),
     }
 )
\ No newline at end of file
@@ -1,20 +1,66 @@
 from dagster import ConfigurableResource
+from pydantic import PrivateAttr
 import requests
+import threading
 import time
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from typing import Optional, Tuple
+import json
 import os
+import shutil
+import sqlite3
 import tempfile
 import re
 import mimetypes
 import urllib.parse
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 class RateLimitedApiClient(ConfigurableResource):
     base_url: str
     # If None or <= 0, rate limiting is disabled
     rate_limit_per_second: Optional[float] = None
+    # Requests allowed back-to-back after an idle spell; the long-run rate still never exceeds rate_limit_per_second
+    rate_limit_burst: int = 1
+    # SQLite file used to revalidate cached GET responses with ETag / Last-Modified. If None, caching is disabled
+    cache_path: Optional[str] = None
+    # Keep-alive connections pooled per host; should cover the number of threads sharing this client
+    pool_maxsize: int = 32
+
+    # Request slots are shared by every thread using this client instance
+    _rate_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _next_request_at: float = PrivateAttr(default=0.0)
+    # Session reused by every request so connections (and their TLS handshakes) are kept alive between calls
+    _session: Optional[requests.Session] = PrivateAttr(default=None)
+    _session_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    # One cache connection per thread; the cache table is created once per client
+    _cache_local: threading.local = PrivateAttr(default_factory=threading.local)
+    _cache_ready: bool = PrivateAttr(default=False)
+
+    def throttle(self):
+        """
+        Block until the next request slot is available.
+
+        Slots are spaced 1 / rate_limit_per_second apart on a monotonic clock, so the limit holds
+        even when requests are issued concurrently from several threads. This is a token bucket:
+        up to `rate_limit_burst` slots saved up while idle may be used at once, and a caller only
+        sleeps when the bucket is empty.
+        """
+        rate = getattr(self, "rate_limit_per_second", None)
+        if not rate or rate <= 0:
+            return
+        interval = 1.0 / rate
+        burst = max(1, self.rate_limit_burst)
+        with self._rate_lock:
+            now = time.monotonic()
+            # _next_request_at is when the bucket would be full again; a request may start up to burst - 1 slots earlier
+            due = max(now, self._next_request_at)
+            slot = max(now, due - (burst - 1) * interval)
+            self._next_request_at = due + interval
+        if slot > now:
+            time.sleep(slot - now)
 
     def get_session(self):
         session = requests.Session()
@@ -28,24 +74,117 @@ class RateLimitedApiClient(ConfigurableResource):
         retry = Retry(
             total=3,
             backoff_factor=1,
-            status_forcelist=[500, 502, 503, 504]
+            # 429 is retried too, waiting for the Retry-After the server sends
+            status_forcelist=[429, 500, 502, 503, 504]
         )
-        adapter = HTTPAdapter(max_retries=retry)
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=self.pool_maxsize, pool_maxsize=self.pool_maxsize)
         session.mount("https://", adapter)
         session.mount("http://", adapter)
         return session
 
-    def get(self, endpoint, params=None):
-        if getattr(self, "rate_limit_per_second", None) and self.rate_limit_per_second > 0:
-            time.sleep(1.0 / self.rate_limit_per_second)
+    def shared_session(self) -> requests.Session:
+        """
+        Return the pooled session shared by all requests of this client, creating it on first use.
+
+        Unlike `get_session()`, which always builds a new session, this keeps connections alive across calls,
+        so repeated requests to the same host skip the TCP/TLS handshake.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self.get_session()
+        return self._session
+
+    def get(self, endpoint, params=None, cached: bool = False):
+        """
+        GET a JSON endpoint and return the decoded response.
+
+        With `cached=True` (and `cache_path` configured) the last response for the same URL is kept on disk and
+        revalidated with If-None-Match / If-Modified-Since, so unchanged resources are answered by a 304 without
+        re-downloading the body.
+        """
+        return json.loads(self.get_bytes(endpoint, params=params, cached=cached))
+
+    def get_bytes(self, endpoint, params=None, cached: bool = False, timeout: float = 10) -> bytes:
+        """
+        GET an endpoint and return the raw response body, without decoding it.
+        Use it when the body is only stored or only partly parsed. Caching works as in `get()`.
+        """
+        self.throttle()
 
         url = endpoint if endpoint.startswith("http") else f"{self.base_url}{endpoint}"
+        use_cache = cached and bool(self.cache_path)
 
-        session = self.get_session()
+        headers = {}
+        entry = None
+        if use_cache:
+            cache_key = requests.Request("GET", url, params=params).prepare().url
+            entry = self._cache_lookup(cache_key)
+            if entry:
+                etag, last_modified, _ = entry
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+
+        session = self.shared_session()
         print(f"Fetching: {url} | Params: {params}")
-        response = session.get(url, params=params, timeout=10)
+        response = session.get(url, params=params, timeout=timeout, headers=headers)
+        if entry and response.status_code == 304:
+            return entry[2]
         response.raise_for_status()
-        return response.json()
+
+        if use_cache:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self._cache_store(cache_key, etag, last_modified, response.content)
+        return response.content
+
+    def _cache_connect(self) -> sqlite3.Connection:
+        """
+        Return this thread's connection to the cache file, opening it on first use.
+
+        Connections use WAL journaling, so lookups are not blocked by stores from other threads or
+        processes sharing the file. The table is created by the first connection of this client only.
+        """
+        conn = getattr(self._cache_local, "conn", None)
+        if conn is not None:
+            return conn
+        if not self._cache_ready:
+            with self._session_lock:
+                if not self._cache_ready:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+                    setup = sqlite3.connect(self.cache_path, timeout=30)
+                    try:
+                        setup.execute("PRAGMA journal_mode=WAL")
+                        setup.execute(
+                            "CREATE TABLE IF NOT EXISTS responses "
+                            "(url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB)"
+                        )
+                        setup.commit()
+                    finally:
+                        setup.close()
+                    self._cache_ready = True
+        conn = sqlite3.connect(self.cache_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        self._cache_local.conn = conn
+        return conn
+
+    def _cache_lookup(self, url: str) -> Optional[Tuple[Optional[str], Optional[str], bytes]]:
+        """
+        Return (etag, last_modified, body) of the cached response for `url`, or None.
+        """
+        return self._cache_connect().execute(
+            "SELECT etag, last_modified, body FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+
+    def _cache_store(self, url: str, etag: Optional[str], last_modified: Optional[str], body: bytes):
+        with self._cache_connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, body) VALUES (?, ?, ?, ?)",
+                (url, etag, last_modified, body),
+            )
 
 
     def _filename_from_content_disposition(self, cd: Optional[str]) -> Optional[str]:
@@ -196,7 +335,7 @@ class RateLimitedApiClient(ConfigurableResource):
         Returns: (saved_full_path or None on failure, actual_resource_filename or None, format extension like 'csv' or 'pdf' or None)
         """
         os.makedirs(folder, exist_ok=True)
-        sess = self.get_session()
+        sess = self.shared_session()
 
         # First attempt a lightweight HEAD to follow redirects and pick up headers
         head_headers = None
@@ -270,11 +409,11 @@ class RateLimitedApiClient(ConfigurableResource):
 
         tmp_path = None
         try:
+            # Copy the raw stream straight into the file in 1 MiB blocks (gzip/deflate still decoded)
+            r.raw.decode_content = True
             with tempfile.NamedTemporaryFile("wb", delete=False, dir=folder) as tmp:
                 tmp_path = tmp.name
-                for chunk in r.iter_content(chunk_size=8192):
-                    if chunk:
-                        tmp.write(chunk)
+                shutil.copyfileobj(r.raw, tmp, length=DOWNLOAD_CHUNK_SIZE)
             os.replace(tmp_path, target_file)
             # return saved path, actual resource filename (may be None), and extension
             return target_file, actual_filename, ext
@@ -285,3 +424,5 @@ class RateLimitedApiClient(ConfigurableResource):
             except Exception:
                 pass
             return None, None, None
+        finally:
+            r.close()
@@ -10,6 +10,7 @@ TARGET_DIR = (CURRENT_DIR / "../../../../target").resolve()
 RAG_ASSET = TARGET_DIR / "ndl_core_rag_index.parquet"
 FAISS_FILE = TARGET_DIR / "index.faiss"
 CHUNK_OVERLAP = 100  # Define the overlap size for merging chunks
+FAISS_NPROBE = 16  # IVF lists scanned per query
 
 def search(query: str, n: int = 15):
     """
@@ -30,6 +31,10 @@ def search(query: str, n: int = 15):
 
     # Load the FAISS index
     faiss_index = faiss.read_index(str(FAISS_FILE))
+    try:
+        faiss.extract_index_ivf(faiss_index).nprobe = FAISS_NPROBE
+    except RuntimeError:
+        pass  # flat index, every vector is compared
 
     # Search the FAISS index
     distances, indices = faiss_index.search(query_embedding, n)
@@ -12,8 +12,9 @@ CLI usage: python -m ndl_core_data_pipeline.resources.refine.dedupe --folder dat
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional
 import hashlib
+import os
 from tqdm import tqdm
 
 
@@ -43,6 +44,23 @@ def _hash_file(path: Path) -> str:
     return h.hexdigest()
 
 
+def _iter_files(folder: str | Path) -> Iterator[Path]:
+    """Yield regular files under `folder` recursively, directory by directory.
+
+    Uses os.scandir so file/dir checks come from the directory entry itself rather than a stat call per path.
+    """
+    with os.scandir(folder) as it:
+        entries = list(it)
+    subdirs = []
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            subdirs.append(entry.path)
+        elif entry.is_file() and entry.name != ".DS_Store":
+            yield Path(entry.path)
+    for subdir in subdirs:
+        yield from _iter_files(subdir)
+
+
 def deduplicate_folder(folder: str | Path = RAW_DATA_DIR,
                        max_size_bytes: int = DEFAULT_MAX_SIZE,
                        output_file: Optional[str | Path] = OUT_FILE) -> List[Path]:
@@ -66,7 +84,7 @@ def deduplicate_folder(folder: str | Path = RAW_DATA_DIR,
     if output_file_path.exists():
         output_file_path.unlink()
 
-    all_files = [p for p in folder_path.rglob("*") if p.is_file() and p.name != ".DS_Store"]
+    all_files = list(_iter_files(folder_path))
 
     seen_hashes = {}
     kept_paths: List[Path] = []
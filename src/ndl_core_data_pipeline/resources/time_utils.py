@@ -1,4 +1,8 @@
 from datetime import datetime, timezone
+from functools import lru_cache
+
+# Parsed timestamps recur across many records (e.g. per-package dates shared by every resource)
+PARSE_CACHE_SIZE = 8192
 
 
 def now_iso8601_utc() -> str:
@@ -27,6 +31,7 @@ def _format_dt_iso(dt: datetime) -> str:
     return f"{base}+00:00"
 
 
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
 def parse_to_iso8601_utc(date_str: str) -> str:
     """Parse a formatted date string into a datetime string in ISO 8601 (UTC) format.
 
@@ -79,6 +84,7 @@ def parse_to_iso8601_utc(date_str: str) -> str:
     raise ValueError(f"Unsupported date format for parsing to ISO 8601 UTC: {date_str!r}")
 
 
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
 def parse_iso_to_ts(ts: str) -> datetime:
     """
     Helper to parse ISO 8601 string to datetime object.
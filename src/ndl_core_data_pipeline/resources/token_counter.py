@@ -1,17 +1,54 @@
 """Helper for counting tokens using tiktoken.
 
-Provides a single function `count_tokens(text, model="gpt-4") -> int` used by the codebase
-for estimating token usage. The implementation prefers `encoding_for_model` and falls back to
+Provides `count_tokens(text, model="gpt-4") -> int` used by the codebase for estimating
+token usage, and `count_tokens_batch(texts, model)` to count many texts at once. The implementation prefers `encoding_for_model` and falls back to
 `cl100k_base` encoding if the model is unknown.
 """
+import hashlib
+import threading
+from functools import lru_cache
+
 import tiktoken
 
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Token counts of recently seen texts, keyed by (model, digest of the text); the oldest entry is evicted first
+TOKEN_CACHE_SIZE = 100_000
+_token_cache: Dict[Tuple[str, bytes], int] = {}
+_token_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _encoding_for_model(model: str):
+    # Prefer a model-specific encoding; fall back to cl100k_base which is used by OpenAI gpt-* models.
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        print("Failed to get encoding for model '{}'".format(model))
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def preload_encoding(model: str = "gpt-5"):
+    """Load the encoding for `model` now rather than on the first count, e.g. when a worker process starts."""
+    _encoding_for_model(model)
+
+
+def _cache_key(model: str, text: str) -> Tuple[str, bytes]:
+    return model, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def _remember(key: Tuple[str, bytes], count: int):
+    # caller holds _token_cache_lock
+    if len(_token_cache) >= TOKEN_CACHE_SIZE:
+        del _token_cache[next(iter(_token_cache))]
+    _token_cache[key] = count
 
 
 def count_tokens(text: Optional[str], model: str = "gpt-5") -> int:
     """Return the number of tokens in `text` for the given `model`.
 
+    Counts are cached by a digest of the text, so repeated texts are only tokenized once.
+
     Args:
         text: input text (None treated as empty)
         model: model name to choose encoding for (defaults to "gpt-4")
@@ -25,14 +62,45 @@ def count_tokens(text: Optional[str], model: str = "gpt-5") -> int:
     if not text:
         return 0
 
-    # Prefer a model-specific encoding; fall back to cl100k_base which is used by OpenAI gpt-* models.
-    try:
-        enc = tiktoken.encoding_for_model(model)
-    except Exception:
-        print("Failed to get encoding for model '{}'".format(model))
-        enc = tiktoken.get_encoding("cl100k_base")
+    key = _cache_key(model, text)
+    cached = _token_cache.get(key)
+    if cached is not None:
+        return cached
 
     # encode returns a list/array of token ids
-    tokens = enc.encode(text)
-    return len(tokens)
+    tokens = _encoding_for_model(model).encode(text)
+    count = len(tokens)
+    with _token_cache_lock:
+        _remember(key, count)
+    return count
+
+
+def count_tokens_batch(texts: Sequence[Optional[str]], model: str = "gpt-5") -> List[int]:
+    """Return the token count of each of `texts`, as `count_tokens` would.
+
+    Texts not in the cache are tokenized together with one `encode_batch` call, which spreads
+    the work over tiktoken's threads instead of encoding the texts one after another.
+
+    Raises:
+        ValueError: if a text contains a special token, like `count_tokens`.
+    """
+    counts = [0] * len(texts)
+    missing = []
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        key = _cache_key(model, text)
+        cached = _token_cache.get(key)
+        if cached is None:
+            missing.append((i, key))
+        else:
+            counts[i] = cached
+    if not missing:
+        return counts
 
+    encoded = _encoding_for_model(model).encode_batch([texts[i] for i, _ in missing])
+    with _token_cache_lock:
+        for (i, key), tokens in zip(missing, encoded):
+            counts[i] = len(tokens)
+            _remember(key, counts[i])
+    return counts
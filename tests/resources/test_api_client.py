@@ -1,5 +1,12 @@
 import unittest
 import os
+import gzip
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from ndl_core_data_pipeline.resources.api_client import RateLimitedApiClient
 
 TEST_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'test_data'))
@@ -39,6 +46,164 @@ class TestApiClientDownloads(unittest.TestCase):
             # pass
             remove_file(path)
 
+class TestApiClientRateLimit(unittest.TestCase):
+    def test_throttle_disabled(self):
+        client = RateLimitedApiClient(base_url="https://example.org", rate_limit_per_second=None)
+        start = time.monotonic()
+        for _ in range(100):
+            client.throttle()
+        self.assertLess(time.monotonic() - start, 0.05)
+
+    def test_throttle_shared_across_threads(self):
+        # 20 requests at 100/s need at least 19 intervals of 10ms, however many threads issue them
+        client = RateLimitedApiClient(base_url="https://example.org", rate_limit_per_second=100.0)
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: client.throttle(), range(20)))
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+    def test_throttle_allows_burst(self):
+        # the first 5 requests use the burst, the 5 after it are paced at 20/s
+        client = RateLimitedApiClient(base_url="https://example.org", rate_limit_per_second=20.0, rate_limit_burst=5)
+        start = time.monotonic()
+        for _ in range(5):
+            client.throttle()
+        self.assertLess(time.monotonic() - start, 0.05)
+        for _ in range(5):
+            client.throttle()
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+
+class _ETagHandler(BaseHTTPRequestHandler):
+    body = json.dumps({"result": {"count": 1}}).encode()
+    etag = '"v1"'
+    conditional_requests = 0
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == self.etag:
+            type(self).conditional_requests += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestApiClientCache(unittest.TestCase):
+    def setUp(self):
+        _ETagHandler.conditional_requests = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ETagHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmpdir.name, "api_cache.sqlite")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def test_revalidates_with_etag(self):
+        client = RateLimitedApiClient(base_url=self.base_url, cache_path=self.cache_path)
+        first = client.get("/search", params={"q": "x"}, cached=True)
+        second = client.get("/search", params={"q": "x"}, cached=True)
+        self.assertEqual(first, {"result": {"count": 1}})
+        self.assertEqual(first, second)
+        self.assertEqual(_ETagHandler.conditional_requests, 1)
+
+    def test_uncached_call_skips_cache(self):
+        client = RateLimitedApiClient(base_url=self.base_url, cache_path=self.cache_path)
+        client.get("/search", cached=True)
+        client.get("/search")
+        self.assertEqual(_ETagHandler.conditional_requests, 0)
+
+    def test_get_bytes_returns_raw_body(self):
+        client = RateLimitedApiClient(base_url=self.base_url, cache_path=self.cache_path)
+        self.assertEqual(_ETagHandler.body, client.get_bytes("/content", cached=True))
+        self.assertEqual(_ETagHandler.body, client.get_bytes("/content", cached=True))
+        self.assertEqual(_ETagHandler.conditional_requests, 1)
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    client_ports = set()
+
+    def do_GET(self):
+        type(self).client_ports.add(self.client_address[1])
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestApiClientConnectionPool(unittest.TestCase):
+    def test_requests_reuse_connection(self):
+        _KeepAliveHandler.client_ports = set()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            client = RateLimitedApiClient(base_url=f"http://127.0.0.1:{server.server_address[1]}")
+            for _ in range(3):
+                self.assertEqual({"ok": True}, client.get("/ping"))
+            self.assertIs(client.shared_session(), client.shared_session())
+            self.assertEqual(1, len(_KeepAliveHandler.client_ports))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class _GzipCsvHandler(BaseHTTPRequestHandler):
+    body = b"a,b\n" + b"1,2\n" * 50000
+
+    def do_HEAD(self):
+        self.send_response(405)
+        self.end_headers()
+
+    def do_GET(self):
+        payload = gzip.compress(self.body)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Disposition", 'attachment; filename="data export.csv"')
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestApiClientStreamedDownload(unittest.TestCase):
+    def test_download_decodes_gzip_stream(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _GzipCsvHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                client = RateLimitedApiClient(base_url="http://127.0.0.1")
+                url = f"http://127.0.0.1:{server.server_address[1]}/export"
+                path, actual_name, fmt = client.download_file(url, tmpdir, preferred_name="resource-1")
+                self.assertEqual(os.path.join(tmpdir, "resource-1.csv"), path)
+                self.assertEqual("data_export.csv", actual_name)
+                self.assertEqual("csv", fmt)
+                with open(path, "rb") as fh:
+                    self.assertEqual(_GzipCsvHandler.body, fh.read())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
 def remove_file(path: str | None):
     try:
         if path and os.path.exists(path):
@@ -68,6 +68,20 @@ class TestTimeUtils(unittest.TestCase):
         out = parse_to_iso8601_utc(inp)
         self.assertEqual(out, "")
 
+    def test_repeated_parse_is_cached(self):
+        parse_to_iso8601_utc.cache_clear()
+        first = parse_to_iso8601_utc("2025-01-01T00:00:00Z")
+        second = parse_to_iso8601_utc("2025-01-01T00:00:00Z")
+        self.assertEqual(first, second)
+        self.assertEqual(parse_to_iso8601_utc.cache_info().hits, 1)
+
+    def test_unsupported_format_is_not_cached(self):
+        parse_to_iso8601_utc.cache_clear()
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                parse_to_iso8601_utc("not a date")
+        self.assertEqual(parse_to_iso8601_utc.cache_info().currsize, 0)
+
 
 if __name__ == "__main__":
     unittest.main()
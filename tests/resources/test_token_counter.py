@@ -5,7 +5,8 @@ except Exception:
     HAS_TIKTOKEN = False
 
 import unittest
-from ndl_core_data_pipeline.resources.token_counter import count_tokens
+from ndl_core_data_pipeline.resources import token_counter
+from ndl_core_data_pipeline.resources.token_counter import count_tokens, count_tokens_batch
 
 
 @unittest.skipUnless(HAS_TIKTOKEN, "tiktoken is not installed; skipping token counter tests")
@@ -26,6 +27,18 @@ class TestTokenCounter(unittest.TestCase):
         b = count_tokens(text)
         self.assertEqual(a, b)
 
+    def test_repeated_text_is_cached(self):
+        text = "Token counts of a text are computed once and then reused."
+        first = count_tokens(text)
+        cache_size = len(token_counter._token_cache)
+        self.assertEqual(count_tokens(text), first)
+        self.assertEqual(len(token_counter._token_cache), cache_size)
+
+    def test_batch_matches_single_counts(self):
+        texts = ["Hello, world!", "", None, "The quick brown fox jumps over the lazy dog."]
+        self.assertEqual(count_tokens_batch(texts), [count_tokens(t) for t in texts])
+        self.assertEqual(count_tokens_batch([]), [])
+
 
 if __name__ == "__main__":
     unittest.main()